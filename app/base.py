@@ -14,7 +14,8 @@ from dotenv import load_dotenv
 from loguru import logger
 from pydantic import BaseModel
 from app.image_gen import ImageGenerator, ImageGeneratorConfig
-from app.prompt_gen import PromptGenerator
+from app.pipeline import Pipeline, PipelineReport
+from app.prompt_gen import PromptGenerator, StoryMiscResponse
 from app.subtitle_gen import SubtitleGenerator
 from app.synth_gen import SynthConfig, SynthGenerator
 from app.video_gen import VideoGenerator, VideoGeneratorConfig
@@ -44,15 +45,18 @@ class VideoAssetCacheItem(BaseModel):
     sentence: str
     """ sentence to generate video from """
 
-    image_prompt: str
+    image_prompt: str = ""
     """ prompt used to generate image """
 
-    tts_speech_url: str
+    tts_speech_url: str = ""
     """ uploaded url to text-to-speech audio """
 
-    media_url: str
+    media_url: str = ""
     """ uploaded url to image """
 
+    segment_path: str = ""
+    """ the sentence rendered on its own, see VideoGenerator.render_segment """
+
 
 class BaseGeneratorConfig(BaseModel):
     job_id: str
@@ -75,6 +79,10 @@ class BaseGeneratorConfig(BaseModel):
     """ config for the image generator """
 
     threads: int = multiprocessing.cpu_count()
+
+    priority: int = 1
+    """ share of the cpu this job gets relative to other concurrent renders """
+
     background_audio_url: str | None = None
 
     prompt: str | None = None
@@ -92,6 +100,12 @@ class BaseGeneratorConfig(BaseModel):
 class StartResponse(BaseModel):
     video_file_path: str
 
+    pipeline: PipelineReport | None = None
+    """ per-stage wall time of the run """
+
+    post_info: StoryMiscResponse | None = None
+    """ hook, title and hashtags for the social media post """
+
 
 class BaseEngine(ABC):
     def __init__(self, config: BaseGeneratorConfig):
@@ -104,12 +118,24 @@ class BaseEngine(ABC):
         self.synth_generator = SynthGenerator(self.cwd, config.synth_config)
         self.prompt_generator = PromptGenerator()
         self.image_generator = ImageGenerator(self.cwd, self.config.image_gen_config)
-        self.threads: int = multiprocessing.cpu_count()
+        self.threads: int = config.threads
 
         self.db_available = True
+        self.pipeline_report: PipelineReport | None = None
  
     async def start(self) -> Any | StartResponse:
         pass
+
+    async def run_pipeline(self, pipeline: Pipeline) -> StartResponse:
+        """runs the stage DAG of the engine, the `render` stage returns the response"""
+        try:
+            results = await pipeline.run()
+        finally:
+            self.pipeline_report = pipeline.report
+
+        response: StartResponse = results["render"]
+        response.pipeline = pipeline.report
+        return response
  
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(5), after=log_attempt_number) # type: ignore
     async def post_complete(self, data: StartResponse):
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+from uuid import uuid4
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.job_queue import JobKind
+from app.utils.http import close_sessions
+from app.utils.strings import load_nlp
+from app.worker import create_engine
+
+
+class BatchRecord(BaseModel):
+    """one line of the batch input file"""
+
+    kind: JobKind = "reels"
+    config: dict[str, Any]
+
+
+class BatchResult(BaseModel):
+    """one line of the batch results file"""
+
+    index: int
+    kind: JobKind
+    job_id: str
+    status: str
+    video_file_path: str | None = None
+    error: str | None = None
+
+    queued_seconds: float = 0
+    """ time spent waiting for a free slot """
+
+    duration_seconds: float = 0
+    """ wall time of the job itself """
+
+    stage_seconds: dict[str, float] = {}
+    critical_path: list[str] = []
+
+
+def read_records(path: str) -> list[BatchRecord]:
+    """reads a jsonl file of configs.
+
+    a line is either `{"kind": "story", "config": {...}}` or a bare config
+    with an optional `kind` key, reels is assumed when it's missing
+    """
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            data = json.loads(line)
+            if "config" not in data:
+                data = {"kind": data.pop("kind", "reels"), "config": data}
+
+            record = BatchRecord.model_validate(data)
+            record.config.setdefault("job_id", uuid4().hex)
+            records.append(record)
+    return records
+
+
+async def run_record(
+    index: int, record: BatchRecord, slots: asyncio.Semaphore
+) -> BatchResult:
+    submitted_at = time.perf_counter()
+    job_id = record.config["job_id"]
+
+    async with slots:
+        started_at = time.perf_counter()
+        result = BatchResult(
+            index=index,
+            kind=record.kind,
+            job_id=job_id,
+            status="done",
+            queued_seconds=round(started_at - submitted_at, 3),
+        )
+
+        try:
+            engine = create_engine(record.kind, record.config)
+            response = await engine.start()
+            result.video_file_path = response.video_file_path
+            if response.pipeline:
+                result.stage_seconds = response.pipeline.stage_seconds()
+                result.critical_path = response.pipeline.critical_path
+        except Exception as e:
+            logger.exception(f"Batch job {index} ({job_id}) failed: {e}")
+            result.status = "failed"
+            result.error = str(e)
+
+        result.duration_seconds = round(time.perf_counter() - started_at, 3)
+        return result
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: int) -> int:
+    """renders every record of `input_path`, returns the number of failed jobs"""
+    records = read_records(input_path)
+    logger.info(f"Rendering {len(records)} jobs, {concurrency} at a time")
+
+    # jobs share this process, so the nlp model, caches and connection pools
+    # are loaded once; while one job waits on the network another renders
+    load_nlp()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    failed = 0
+    started = time.perf_counter()
+
+    tasks = [
+        asyncio.create_task(run_record(i, record, slots))
+        for i, record in enumerate(records)
+    ]
+
+    try:
+        with open(output_path, "w") as out:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                failed += result.status == "failed"
+
+                # written as they finish so a crash keeps the finished results
+                out.write(result.model_dump_json() + "\n")
+                out.flush()
+                logger.info(
+                    f"Batch job {result.index} {result.status} in {result.duration_seconds}s"
+                )
+    finally:
+        await close_sessions()
+
+    logger.info(
+        f"Batch finished in {round(time.perf_counter() - started, 1)}s, {failed} failed"
+    )
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render reels from a JSONL file")
+    parser.add_argument("input", help="jsonl file of ReelsMakerConfig/StoryTellerConfig")
+    parser.add_argument("-o", "--output", default="results.jsonl")
+    parser.add_argument("-c", "--concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    failed = asyncio.run(run_batch(args.input, args.output, args.concurrency))
+    raise SystemExit(1 if failed else 0)
@@ -18,6 +18,8 @@ audios_cache_path = os.path.join(parent, "cache/audios_cache")
 images_cache_path = os.path.join(parent, "cache/images_cache")
 fonts_cache_path = os.path.join(parent, "cache/fonts_cache")
 llm_cache_path = os.path.join(parent, "cache/llm_cache")
+jobs_db_path = os.path.join(parent, "cache/jobs.db")
+projects_cache_path = os.path.join(parent, "cache/projects")
 
 
 def ensure_caches():
@@ -27,6 +29,7 @@ def ensure_caches():
     os.makedirs(images_cache_path, exist_ok=True)
     os.makedirs(fonts_cache_path, exist_ok=True)
     os.makedirs(llm_cache_path, exist_ok=True)
+    os.makedirs(projects_cache_path, exist_ok=True)
 
 
 ensure_caches()
@@ -58,6 +61,23 @@ class __Settings(BaseSettings):
     
     OPENAI_MODEL_NAME: str = Field(None)
 
+    WORKER_CONCURRENCY: int = 1
+    """ number of worker processes rendering jobs from the queue """
+
+    WORKER_POLL_INTERVAL: float = 1.0
+
+    IMAGE_REUSE_THRESHOLD: float = 0.9
+    """ similarity above which a cached image is reused for a new prompt, above 1 disables it """
+
+    IMAGE_REUSE_THRESHOLDS: dict[str, float] = {}
+    """ per-style overrides of IMAGE_REUSE_THRESHOLD, eg. {"Human Realism": 0.95} """
+
+    LLM_CACHE_TTL: float = 7 * 24 * 3600
+    """ seconds a cached llm response is reused for, 0 keeps them forever """
+
+    LLM_CACHE_SIMILARITY: float = 1.0
+    """ below 1, a prompt this similar to a cached one reuses its response """
+
 
 # all ways use this settings rather than using __Settings()
 settings = __Settings()  # type: ignore
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from loguru import logger
+from pydantic import BaseModel
+
+
+class ThreadGrant(BaseModel):
+    """thread counts handed to one ffmpeg launch"""
+
+    job_id: str
+    priority: int = 1
+
+    threads: int = 1
+    """ encoder threads (-threads) """
+
+    filter_threads: int = 1
+    """ filtergraph threads (-filter_complex_threads) """
+
+
+class CPUGovernor:
+    """Divides the cores of the machine between the renders running in this process.
+
+    A render asks for a grant right before ffmpeg is launched and gives it back
+    when ffmpeg exits. The share of a render is proportional to its priority
+    among the active renders, taken from the cores that aren't already busy
+    with work outside of our renders (based on the 1 minute load average).
+    """
+
+    def __init__(self, cpus: int | None = None):
+        self.cpus = cpus or multiprocessing.cpu_count()
+        self._lock = threading.Lock()
+        self._grants: dict[str, ThreadGrant] = {}
+
+    def load_average(self) -> float:
+        try:
+            return os.getloadavg()[0]
+        except (AttributeError, OSError):
+            return 0.0
+
+    def available_cpus(self) -> int:
+        """cores that are not used by something other than our renders"""
+        granted = sum(grant.threads for grant in self._grants.values())
+        external = max(0.0, self.load_average() - granted)
+        return max(1, round(self.cpus - external))
+
+    def grant(
+        self, job_id: str, priority: int = 1, max_threads: int | None = None
+    ) -> ThreadGrant:
+        with self._lock:
+            priority = max(1, priority)
+            total_priority = priority + sum(
+                grant.priority for grant in self._grants.values()
+            )
+
+            share = self.available_cpus() * priority // total_priority
+            threads = max(1, share)
+            if max_threads:
+                threads = min(threads, max_threads)
+
+            grant = ThreadGrant(
+                job_id=job_id,
+                priority=priority,
+                threads=threads,
+                # filters run alongside the encoder, most of them on one thread
+                filter_threads=max(1, threads // 2),
+            )
+            self._grants[job_id] = grant
+
+        logger.debug(
+            f"CPU grant for {job_id}: {grant.threads} encoder / {grant.filter_threads} filter threads "
+            f"({len(self._grants)} active renders)"
+        )
+        return grant
+
+    def release(self, job_id: str):
+        with self._lock:
+            self._grants.pop(job_id, None)
+
+    @contextmanager
+    def acquire(
+        self, job_id: str, priority: int = 1, max_threads: int | None = None
+    ) -> Iterator[ThreadGrant]:
+        grant = self.grant(job_id, priority=priority, max_threads=max_threads)
+        try:
+            yield grant
+        finally:
+            self.release(job_id)
+
+    @property
+    def active(self) -> list[ThreadGrant]:
+        return list(self._grants.values())
+
+
+# all renders in this process share this governor
+governor = CPUGovernor()
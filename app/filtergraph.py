@@ -0,0 +1,317 @@
+from collections import Counter
+from typing import Callable
+
+import ffmpeg
+from ffmpeg.nodes import (
+    FilterableStream,
+    FilterNode,
+    GlobalNode,
+    InputNode,
+    OutputNode,
+)
+from loguru import logger
+from pydantic import BaseModel
+
+from app.utils.strings import FFMPEG_TYPE
+
+# resolves the (width, height) of an input file, None when unknown
+SizeResolver = Callable[[str], tuple[int, int] | None]
+
+# per-frame filters that give the same result before or after a concat
+HOISTABLE_FILTERS = {"scale", "format"}
+
+# filters that don't change the frame size
+SIZE_PRESERVING_FILTERS = {"format", "fps", "setsar", "drawtext", "subtitles"}
+
+# zoompan renders to hd720 unless `s` is given
+ZOOMPAN_DEFAULT_SIZE = (1280, 720)
+
+
+class FilterGraphStats(BaseModel):
+    """counts of the nodes in a filtergraph"""
+
+    inputs: int = 0
+    filters: int = 0
+    filter_counts: dict[str, int] = {}
+
+
+def graph_stats(stream: FFMPEG_TYPE) -> FilterGraphStats:
+    """walks the graph upstream of `stream` and counts inputs and filters"""
+
+    seen = set()
+    counts: Counter[str] = Counter()
+    inputs = 0
+    pending = [stream.node]
+
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+
+        if isinstance(node, InputNode):
+            inputs += 1
+        elif isinstance(node, FilterNode):
+            counts[node.name] += 1
+
+        pending.extend(edge.upstream_node for edge in node.incoming_edges)
+
+    return FilterGraphStats(
+        inputs=inputs,
+        filters=sum(counts.values()),
+        filter_counts=dict(counts),
+    )
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scale_target(node: FilterNode) -> tuple[int, int] | None:
+    """returns the absolute size of a scale filter, None for expressions"""
+    if len(node.args) >= 2:
+        w, h = node.args[0], node.args[1]
+    else:
+        w, h = node.kwargs.get("w"), node.kwargs.get("h")
+
+    w, h = _to_int(w), _to_int(h)
+    if w is None or h is None or w <= 0 or h <= 0:
+        return None
+    return w, h
+
+
+def _edge_stream(edge) -> FFMPEG_TYPE:
+    return edge.upstream_node.stream(edge.upstream_label, edge.upstream_selector)
+
+
+def _upstream(node) -> FFMPEG_TYPE:
+    return _edge_stream(node.incoming_edges[0])
+
+
+def _signature(node: FilterNode):
+    return node.name, list(node.args), dict(node.kwargs)
+
+
+class FilterGraphOptimizer:
+    """Rewrites a graph built with ffmpeg-python before it is handed to ffmpeg.
+
+    - every concat segment gets an explicit fps filter right after its input,
+      so high frame rate stock footage is thinned before any filter touches it
+    - filters applied identically to every segment of a video concat are
+      hoisted past the concat so the joined stream carries them once
+    - scales to the size the stream already has are dropped, a scale right
+      after another absolute scale is collapsed and a scale after zoompan is
+      folded into zoompan's own output size
+    - the joined stream gets one explicit pix_fmt/sar normalization, so ffmpeg
+      doesn't negotiate implicit converters in front of the overlay filters
+    """
+
+    def __init__(
+        self,
+        fps: int,
+        pix_fmt: str = "yuv420p",
+        size_resolver: SizeResolver | None = None,
+    ):
+        self.fps = fps
+        self.pix_fmt = pix_fmt
+        self.size_resolver = size_resolver
+        self._rebuilt: dict[int, FFMPEG_TYPE] = {}
+        self._normalized = False
+
+    def optimize(self, output: FFMPEG_TYPE) -> FFMPEG_TYPE:
+        self._rebuilt = {}
+        self._normalized = False
+
+        before = graph_stats(output)
+        optimized = self._rebuild(output)
+        after = graph_stats(optimized)
+
+        logger.debug(f"Filtergraph before optimization: {before.model_dump()}")
+        logger.debug(f"Filtergraph after optimization: {after.model_dump()}")
+        return optimized
+
+    def infer_size(self, stream: FFMPEG_TYPE) -> tuple[int, int] | None:
+        """best effort frame size of a stream, None when it can't be known"""
+        node = stream.node
+
+        if isinstance(node, InputNode):
+            if not self.size_resolver:
+                return None
+            return self.size_resolver(node.kwargs["filename"])
+
+        if not isinstance(node, FilterNode) or len(node.incoming_edges) != 1:
+            return None
+
+        if node.name == "scale":
+            return _scale_target(node)
+
+        if node.name == "zoompan":
+            size = node.kwargs.get("s")
+            if size is None:
+                return ZOOMPAN_DEFAULT_SIZE
+            w, _, h = str(size).partition("x")
+            w, h = _to_int(w), _to_int(h)
+            return (w, h) if w and h else None
+
+        if node.name == "crop":
+            w, h = _to_int(node.kwargs.get("w")), _to_int(node.kwargs.get("h"))
+            return (w, h) if w and h else None
+
+        if node.name in SIZE_PRESERVING_FILTERS:
+            return self.infer_size(_upstream(node))
+
+        return None
+
+    def _rebuild(self, stream: FFMPEG_TYPE) -> FFMPEG_TYPE:
+        node = stream.node
+
+        if isinstance(node, InputNode):
+            return stream
+
+        key = id(node)
+        if key not in self._rebuilt:
+            self._rebuilt[key] = self._rebuild_node(node)
+
+        rebuilt = self._rebuilt[key]
+        if isinstance(rebuilt, FilterableStream):
+            # the node was replaced by a stream (dropped or rewritten filter)
+            return rebuilt
+        return rebuilt.stream(stream.label, stream.selector)
+
+    def _rebuild_node(self, node):
+        if isinstance(node, OutputNode):
+            streams = [self._rebuild(_edge_stream(e)) for e in node.incoming_edges]
+            return OutputNode(streams, node.name, args=node.args, kwargs=node.kwargs)
+
+        if isinstance(node, GlobalNode):
+            stream = self._rebuild(_upstream(node))
+            return GlobalNode(stream, node.name, args=node.args, kwargs=node.kwargs)
+
+        if not isinstance(node, FilterNode):
+            return node
+
+        if (
+            node.name == "concat"
+            and int(node.kwargs.get("v", 1)) == 1
+            and int(node.kwargs.get("a", 0)) == 0
+        ):
+            return self._rebuild_concat(node)
+
+        streams = [self._rebuild(_edge_stream(e)) for e in node.incoming_edges]
+
+        if node.name == "scale" and len(streams) == 1:
+            target = _scale_target(node)
+            if target:
+                return self._rebuild_scale(streams[0], node, target)
+
+        return FilterNode(
+            streams, node.name, max_inputs=None, args=node.args, kwargs=node.kwargs
+        )
+
+    def _rebuild_scale(
+        self, upstream: FFMPEG_TYPE, node: FilterNode, target: tuple[int, int]
+    ) -> FFMPEG_TYPE:
+        # a scale right before an absolute scale is wasted work
+        while (
+            isinstance(upstream.node, FilterNode)
+            and upstream.node.name == "scale"
+            and len(upstream.node.incoming_edges) == 1
+        ):
+            upstream = _upstream(upstream.node)
+
+        if self.infer_size(upstream) == target:
+            return upstream
+
+        # zoompan already resamples every frame, let it render at the target
+        zoompan = upstream.node
+        if (
+            isinstance(zoompan, FilterNode)
+            and zoompan.name == "zoompan"
+            and "s" not in zoompan.kwargs
+        ):
+            w, h = target
+            return FilterNode(
+                _upstream(zoompan),
+                zoompan.name,
+                args=zoompan.args,
+                kwargs={**zoompan.kwargs, "s": f"{w}x{h}"},
+            ).stream()
+
+        return FilterNode(upstream, node.name, args=node.args, kwargs=node.kwargs).stream()
+
+    def _with_input_fps(self, stream: FFMPEG_TYPE) -> FFMPEG_TYPE:
+        """inserts an fps filter right after the input at the root of a chain"""
+        node = stream.node
+
+        if isinstance(node, InputNode):
+            return stream.filter("fps", fps=self.fps)
+
+        if not isinstance(node, FilterNode) or len(node.incoming_edges) != 1:
+            return stream
+
+        if node.name == "fps":
+            return stream
+
+        upstream = self._with_input_fps(_upstream(node))
+        return FilterNode(
+            upstream, node.name, args=node.args, kwargs=node.kwargs
+        ).stream(stream.label, stream.selector)
+
+    def _rebuild_concat(self, node: FilterNode) -> FFMPEG_TYPE:
+        branches = [
+            self._with_input_fps(self._rebuild(_edge_stream(e)))
+            for e in node.incoming_edges
+        ]
+        hoisted: list[FilterNode] = []
+
+        while True:
+            tails = [branch.node for branch in branches]
+            if not all(
+                isinstance(tail, FilterNode) and len(tail.incoming_edges) == 1
+                for tail in tails
+            ):
+                break
+
+            first = tails[0]
+            if first.name not in HOISTABLE_FILTERS or any(
+                _signature(tail) != _signature(first) for tail in tails[1:]
+            ):
+                break
+
+            upstream = [_upstream(tail) for tail in tails]
+
+            # concat needs every segment to have the same size, so a scale
+            # can only move once the segments already match
+            if first.name == "scale":
+                sizes = {self.infer_size(s) for s in upstream}
+                if len(sizes) != 1 or None in sizes:
+                    break
+
+            # identical branches would need a split filter
+            if len({s.node for s in upstream}) != len(upstream):
+                break
+
+            hoisted.insert(0, first)
+            branches = upstream
+
+        stream = ffmpeg.concat(*branches, v=1, a=0)
+        for f in hoisted:
+            stream = stream.filter(f.name, *f.args, **f.kwargs)
+
+        if hoisted:
+            logger.debug(
+                f"Hoisted {[f.name for f in hoisted]} past concat of {len(branches)} clips"
+            )
+
+        if not self._normalized:
+            # a hoisted format (eg. gray) already pins the pixel format, a
+            # second one would only add a conversion pass
+            if not any(f.name == "format" for f in hoisted):
+                stream = stream.filter("format", self.pix_fmt)
+            stream = stream.filter("setsar", 1)
+            self._normalized = True
+
+        return stream
@@ -13,6 +13,8 @@ from PIL import Image
 from pydantic import BaseModel
 
 from app.config import images_cache_path
+from app.image_index import ImageMatch, ImagePromptIndex
+from app.utils.http import get_httpx_client
 from app.utils.path_util import search_file, text_to_sha256_hash
 from app.config import settings
 
@@ -34,6 +36,9 @@ class ImageGeneratorConfig(BaseModel):
     height: int = 1024
     style: ImageGenStyle | str = "Human Realism"
 
+    reuse_threshold: float | None = None
+    """ overrides the IMAGE_REUSE_THRESHOLD(S) settings for this job """
+
 
 class ImageGenerator:
     def __init__(self, cwd: str, config: ImageGeneratorConfig):
@@ -42,6 +47,10 @@ class ImageGenerator:
         self.base = os.path.join(self.cwd, "background_images")
         self.seed = random.randint(10, 100)
 
+        self.index = ImagePromptIndex(os.path.join(images_cache_path, "prompts.db"))
+        # cached images reused for near identical prompts during this job
+        self.matches: list[ImageMatch] = []
+
         logger.info(f"Using image generator with seed: {self.seed}")
 
         os.makedirs(self.base, exist_ok=True)
@@ -60,18 +69,19 @@ class ImageGenerator:
 
         logger.debug(f"Generating image from prompt: {prompt}")
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(100.0)) as client:
-            response = await client.post(
-                url,
-                headers={"Authorization": f"Bearer {os.getenv('DEEPINFRA_API_KEY')}"},
-                json={"prompt": prompt},
-            )
+        client = get_httpx_client()
+        response = await client.post(
+            url,
+            headers={"Authorization": f"Bearer {os.getenv('DEEPINFRA_API_KEY')}"},
+            json={"prompt": prompt},
+            timeout=httpx.Timeout(100.0),
+        )
 
-            response = response.json()
+        response = response.json()
 
-            # get base64 image
-            base64_str = response["images"][0]
-            self.save_b64_to_file(base64_str, fpath)
+        # get base64 image
+        base64_str = response["images"][0]
+        self.save_b64_to_file(base64_str, fpath)
 
     def maybe_remove_b64_prefix(self, s: str) -> str:
         r = "data:image/png;base64,"
@@ -106,37 +116,37 @@ class ImageGenerator:
         response: httpx.Response | None = None
 
         async def use_anyai():
-            async with httpx.AsyncClient(timeout=None) as client:
-                url = "https://api.airforce/v1/imagine"
-                url = f"{url}?prompt={prompt}&width={self.config.width}&height={self.config.height}&model={model}&seed={self.seed}&nologo=true"
-                try:
-                    response = await client.get(url)
-                    response.raise_for_status()
-                    return response
-                except httpx.HTTPStatusError as e:
-                    logger.error(
-                        f"AnyAI request failed with status {e.response.status_code}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error during AnyAI request: {e}")
-                return None
+            client = get_httpx_client()
+            url = "https://api.airforce/v1/imagine"
+            url = f"{url}?prompt={prompt}&width={self.config.width}&height={self.config.height}&model={model}&seed={self.seed}&nologo=true"
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                logger.error(
+                    f"AnyAI request failed with status {e.response.status_code}"
+                )
+            except Exception as e:
+                logger.error(f"Error during AnyAI request: {e}")
+            return None
 
         async def use_pollination():
-            async with httpx.AsyncClient(timeout=None) as client:
-                logger.debug("using pollination")
-                url = "https://image.pollinations.ai/prompt"
-                url = f"{url}/{prompt}?width={self.config.width}&height={self.config.height}&model=flux&seed={self.seed}&nologo=true"
-                try:
-                    response = await client.post(url)
-                    response.raise_for_status()
-                    return response
-                except httpx.HTTPStatusError as e:
-                    logger.error(
-                        f"Pollination request failed with status {e.response.status_code}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error during Pollination request: {e}")
-                return None
+            client = get_httpx_client()
+            logger.debug("using pollination")
+            url = "https://image.pollinations.ai/prompt"
+            url = f"{url}/{prompt}?width={self.config.width}&height={self.config.height}&model=flux&seed={self.seed}&nologo=true"
+            try:
+                response = await client.post(url)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                logger.error(
+                    f"Pollination request failed with status {e.response.status_code}"
+                )
+            except Exception as e:
+                logger.error(f"Error during Pollination request: {e}")
+            return None
 
         response = await use_pollination()
         if not response:
@@ -186,6 +196,11 @@ class ImageGenerator:
 
             return cached_image_path
 
+        match = await self.find_similar_image(prompt)
+        if match:
+            shutil.copy2(match.image_path, self.base)
+            return match.image_path
+
         if settings.IMAGE_PROVIDER == "pollination":
             await self.generate_maybe_anyai_pollination(fpath, prompt)
         elif settings.IMAGE_PROVIDER == "deepinfra":
@@ -200,5 +215,31 @@ class ImageGenerator:
             os.remove(fpath)
             raise ValueError("Failed to generate image")
 
+        self.index.add(self.config.style, prompt, fpath)
         shutil.copy2(fpath, self.base)
-        return fpath
\ No newline at end of file
+        return fpath
+
+    def reuse_threshold(self) -> float:
+        if self.config.reuse_threshold is not None:
+            return self.config.reuse_threshold
+        return settings.IMAGE_REUSE_THRESHOLDS.get(
+            self.config.style, settings.IMAGE_REUSE_THRESHOLD
+        )
+
+    async def find_similar_image(self, prompt: str) -> ImageMatch | None:
+        """an image generated for a near identical prompt of the same style"""
+        match = self.index.best_match(self.config.style, prompt, self.reuse_threshold())
+        if not match:
+            return None
+
+        if not os.path.exists(match.image_path) or not await self.image_valid(
+            match.image_path
+        ):
+            self.index.remove(match.image_path)
+            return None
+
+        logger.info(
+            f"Reusing image with similarity {match.score}: {prompt} ~ {match.matched_prompt}"
+        )
+        self.matches.append(match)
+        return match
\ No newline at end of file
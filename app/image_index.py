@@ -0,0 +1,102 @@
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from pydantic import BaseModel
+
+
+class ImageMatch(BaseModel):
+    """a cached image reused for a near identical prompt"""
+
+    prompt: str
+    matched_prompt: str
+    image_path: str
+    score: float
+
+
+def shingles(prompt: str) -> set[str]:
+    """the words and word pairs of a prompt, lowercased without punctuation"""
+    words = re.findall(r"\w+", prompt.lower())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def prompt_similarity(a: str, b: str) -> float:
+    """jaccard similarity of the shingles of two prompts, a word swapped in a
+    30 word prompt scores about 0.9"""
+    left, right = shingles(a), shingles(b)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class ImagePromptIndex:
+    """Index of the prompts of generated images, per style.
+
+    Stored next to the images cache in SQLite (WAL mode, a connection per
+    call) so every worker process sees the images the others generated.
+    """
+
+    def __init__(self, db_path: str, max_candidates: int = 2000):
+        self.db_path = db_path
+        self.max_candidates = max_candidates
+
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS image_prompts (
+                    image_path TEXT PRIMARY KEY,
+                    style TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS image_prompts_style ON image_prompts (style, created_at DESC)"
+            )
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, style: str, prompt: str, image_path: str):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO image_prompts (image_path, style, prompt, created_at) VALUES (?, ?, ?, ?)",
+                (image_path, style, prompt, time.time()),
+            )
+
+    def remove(self, image_path: str):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM image_prompts WHERE image_path = ?", (image_path,))
+
+    def best_match(self, style: str, prompt: str, threshold: float) -> ImageMatch | None:
+        """the most similar prompt of the style scoring at least `threshold`"""
+        if threshold > 1:
+            return None
+
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT image_path, prompt FROM image_prompts WHERE style = ? ORDER BY created_at DESC LIMIT ?",
+                (style, self.max_candidates),
+            ).fetchall()
+
+        best: ImageMatch | None = None
+        for row in rows:
+            score = prompt_similarity(prompt, row["prompt"])
+            if score >= threshold and (not best or score > best.score):
+                best = ImageMatch(
+                    prompt=prompt,
+                    matched_prompt=row["prompt"],
+                    image_path=row["image_path"],
+                    score=round(score, 3),
+                )
+        return best
@@ -0,0 +1,174 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Literal
+from uuid import uuid4
+
+from loguru import logger
+from pydantic import BaseModel
+
+JobKind = Literal["reels", "story"]
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class Job(BaseModel):
+    """a render request stored in the job queue"""
+
+    id: str
+    kind: JobKind
+    priority: int = 1
+    status: JobStatus = "queued"
+
+    config: dict[str, Any]
+    """ dumped ReelsMakerConfig / StoryTellerConfig """
+
+    result: dict[str, Any] | None = None
+    """ dumped StartResponse once the job is done """
+
+    error: str | None = None
+    worker: str | None = None
+
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class JobQueue:
+    """Durable job queue backed by SQLite.
+
+    Every call opens its own connection so the queue can be shared by the
+    streamlit script and any number of worker processes. Jobs are claimed
+    highest priority first, then oldest first.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 1,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    config TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at)"
+            )
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        # autocommit mode, transactions are opened explicitly where needed
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _to_job(self, row: sqlite3.Row) -> Job:
+        data = dict(row)
+        data["config"] = json.loads(data["config"])
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        return Job.model_validate(data)
+
+    def submit(self, kind: JobKind, config: BaseModel, priority: int = 1) -> Job:
+        job = Job(
+            id=str(uuid4()),
+            kind=kind,
+            priority=priority,
+            config=json.loads(config.model_dump_json()),
+            created_at=time.time(),
+        )
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, priority, status, config, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job.id,
+                    job.kind,
+                    job.priority,
+                    job.status,
+                    json.dumps(job.config),
+                    job.created_at,
+                ),
+            )
+
+        logger.info(f"Queued {kind} job {job.id} with priority {priority}")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def claim(self, worker: str) -> Job | None:
+        """atomically moves the next queued job to running"""
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at ASC LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                        (worker, time.time(), row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return self.get(row["id"]) if row else None
+
+    def complete(self, job_id: str, result: BaseModel):
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                (result.model_dump_json(), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """puts jobs left running by a crashed instance back in the queue"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE status = 'running'"
+            )
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} interrupted jobs")
+        return cursor.rowcount
+
+    def position(self, job_id: str) -> int:
+        """number of queued jobs that will be claimed before this one"""
+        job = self.get(job_id)
+        if not job or job.status != "queued":
+            return 0
+
+        with self.connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) FROM jobs WHERE status = 'queued'
+                AND (priority > ? OR (priority = ? AND created_at < ?))
+                """,
+                (job.priority, job.priority, job.created_at),
+            ).fetchone()
+        return row[0]
@@ -0,0 +1,256 @@
+import ast
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from loguru import logger
+from pydantic import BaseModel
+
+DEFAULT_KEY_FIELDS = ("name", "model_name", "model", "stop", "n", "response_format")
+""" llm params that change what a prompt returns, everything else (temperature,
+retries, api keys...) is left out of the key """
+
+
+class LLMCacheStats(BaseModel):
+    entries: int = 0
+    exact_hits: int = 0
+    similar_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.exact_hits + self.similar_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def normalize_prompt(prompt: str) -> str:
+    """the text of a dumped list of messages, lowercased with the punctuation
+    and whitespace collapsed"""
+    try:
+        messages = json.loads(prompt)
+        prompt = "\n".join(
+            f"{m['kwargs'].get('type', '')}: {m['kwargs'].get('content', '')}"
+            for m in messages
+        )
+    except (ValueError, TypeError, KeyError):
+        pass
+
+    words = re.findall(r"\w+", prompt.lower())
+    return " ".join(words)
+
+
+def ngrams(text: str, n: int = 3) -> set[str]:
+    text = f" {text} "
+    return {text[i : i + n] for i in range(max(1, len(text) - n + 1))}
+
+
+def prompt_similarity(a: str, b: str) -> float:
+    """similarity of two normalized prompts.
+
+    prompts built from the same template share most of their text, so only
+    the words that differ are compared, ie. "a quote about love" and "a quote
+    about life" score 0 while "about focus and discipline" and "about
+    discipline and focus" score close to 1
+    """
+    if a == b:
+        return 1.0
+
+    left, right = a.split(), b.split()
+    start = 0
+    while start < min(len(left), len(right)) and left[start] == right[start]:
+        start += 1
+    end = 0
+    while (
+        end < min(len(left), len(right)) - start
+        and left[-1 - end] == right[-1 - end]
+    ):
+        end += 1
+
+    left_diff = " ".join(left[start : len(left) - end])
+    right_diff = " ".join(right[start : len(right) - end])
+    if not left_diff or not right_diff:
+        # one prompt is the other with extra words
+        return 0.0
+
+    left_grams, right_grams = ngrams(left_diff), ngrams(right_diff)
+    return len(left_grams & right_grams) / len(left_grams | right_grams)
+
+
+class LLMCache(BaseCache):
+    """LLM response cache backed by SQLite in WAL mode.
+
+    Like the job queue, every call opens its own connection so the cache is
+    shared by the streamlit app and every worker process. The key is built
+    from the normalized prompt and only the llm params in `key_fields`, so
+    sampling params like the temperature don't split the cache. When
+    `similarity` is below 1, a miss falls back to the most similar cached
+    prompt of the same llm, compared with character trigrams.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: float = 0,
+        similarity: float = 1.0,
+        key_fields: Sequence[str] = DEFAULT_KEY_FIELDS,
+        max_candidates: int = 500,
+    ):
+        self.db_path = db_path
+        # seconds an entry is served for, 0 keeps entries forever
+        self.ttl = ttl
+
+        self.similarity = similarity
+        self.key_fields = tuple(key_fields)
+        self.max_candidates = max_candidates
+
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    llm_key TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_llm ON llm_cache (llm_key, created_at DESC)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def llm_key(self, llm_string: str) -> str:
+        """hash of the `key_fields` of the llm and call params"""
+        model, _, call = llm_string.partition("---")
+        try:
+            params = json.loads(model).get("kwargs", {})
+            if call:
+                params.update(dict(ast.literal_eval(call)))
+            picked = {field: params.get(field) for field in self.key_fields}
+            raw = json.dumps(picked, sort_keys=True, default=str)
+        except (ValueError, SyntaxError, TypeError, AttributeError):
+            raw = llm_string
+
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def key(self, normalized_prompt: str, llm_key: str) -> str:
+        return hashlib.sha256(f"{llm_key}:{normalized_prompt}".encode()).hexdigest()
+
+    def _count(self, conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO llm_cache_stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def _loads(self, response: str) -> RETURN_VAL_TYPE | None:
+        try:
+            return [loads(gen) for gen in json.loads(response)]
+        except Exception as e:
+            logger.warning(f"Dropping unreadable llm cache entry: {e}")
+            return None
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        normalized = normalize_prompt(prompt)
+        llm_key = self.llm_key(llm_string)
+        key = self.key(normalized, llm_key)
+        now = time.time()
+
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT key, response FROM llm_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+            hit = "exact_hits" if row else None
+
+            if not row and self.similarity < 1:
+                candidates = conn.execute(
+                    """
+                    SELECT key, prompt, response FROM llm_cache
+                    WHERE llm_key = ? AND (expires_at IS NULL OR expires_at > ?)
+                    ORDER BY created_at DESC LIMIT ?
+                    """,
+                    (llm_key, now, self.max_candidates),
+                ).fetchall()
+
+                best, best_score = None, self.similarity
+                for candidate in candidates:
+                    score = prompt_similarity(normalized, candidate["prompt"])
+                    if score >= best_score:
+                        best, best_score = candidate, score
+
+                if best:
+                    logger.debug(f"LLM cache similar hit ({round(best_score, 3)})")
+                    row, hit = best, "similar_hits"
+
+            self._count(conn, hit or "misses")
+            if row:
+                conn.execute("UPDATE llm_cache SET hits = hits + 1 WHERE key = ?", (row["key"],))
+
+        return self._loads(row["response"]) if row else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        normalized = normalize_prompt(prompt)
+        llm_key = self.llm_key(llm_string)
+        now = time.time()
+
+        with self.connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, llm_key, prompt, response, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    self.key(normalized, llm_key),
+                    llm_key,
+                    normalized,
+                    json.dumps([dumps(gen) for gen in return_val]),
+                    now,
+                    now + self.ttl if self.ttl else None,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+            conn.execute("DELETE FROM llm_cache_stats")
+
+    def stats(self) -> LLMCacheStats:
+        with self.connect() as conn:
+            counters = {
+                row["name"]: row["value"]
+                for row in conn.execute("SELECT name, value FROM llm_cache_stats")
+            }
+            entries = conn.execute(
+                "SELECT COUNT(*) FROM llm_cache WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),),
+            ).fetchone()[0]
+        return LLMCacheStats(entries=entries, **counters)
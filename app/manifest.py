@@ -0,0 +1,83 @@
+import os
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.base import VideoAssetCacheItem
+
+
+class ProjectManifest(BaseModel):
+    project_id: str
+
+    style: str = ""
+    """ image style the image prompts were written for """
+
+    items: list[VideoAssetCacheItem] = []
+
+
+class AssetManifest:
+    """The assets generated for every sentence of a project.
+
+    Items are keyed by sentence text, so editing, inserting or reordering
+    sentences keeps the assets of the others. The manifest is written after
+    every asset, a crashed job picks up from the last one it finished.
+    """
+
+    def __init__(self, project_dir: str, project_id: str):
+        self.project_dir = project_dir
+        self.path = os.path.join(project_dir, "manifest.json")
+        self.segments_dir = os.path.join(project_dir, "segments")
+        os.makedirs(self.segments_dir, exist_ok=True)
+
+        self.data = ProjectManifest(project_id=project_id)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.data = ProjectManifest.model_validate_json(f.read())
+                logger.info(
+                    f"Loaded manifest of {project_id} with {len(self.data.items)} sentences"
+                )
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+        self.items = {item.sentence: item for item in self.data.items}
+
+    def get(self, sentence: str) -> VideoAssetCacheItem:
+        if sentence not in self.items:
+            self.items[sentence] = VideoAssetCacheItem(sentence=sentence)
+        return self.items[sentence]
+
+    def set_style(self, style: str):
+        """image prompts are written for a style, drop them when it changes"""
+        if self.data.style == style:
+            return
+
+        if self.data.style:
+            logger.info(f"Image style changed from {self.data.style}, dropping image assets")
+        self.items = {
+            sentence: VideoAssetCacheItem(
+                sentence=sentence, tts_speech_url=item.tts_speech_url
+            )
+            for sentence, item in self.items.items()
+        }
+        self.data.style = style
+
+    def prune(self, sentences: list[str]):
+        """keeps the items of `sentences` only, in script order, and removes
+        the segments nothing refers to anymore"""
+        self.items = {sentence: self.get(sentence) for sentence in sentences}
+
+        used = {item.segment_path for item in self.items.values()}
+        for fname in os.listdir(self.segments_dir):
+            path = os.path.join(self.segments_dir, fname)
+            if path not in used:
+                os.remove(path)
+
+    def save(self):
+        self.data.items = list(self.items.values())
+
+        # write then rename, a crash mid-write keeps the previous manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.data.model_dump_json(indent=2))
+        os.replace(tmp_path, self.path)
@@ -1,6 +1,8 @@
+import asyncio
 import os
 from loguru import logger
-import requests
+
+from app.utils.http import requests_session
 
 
 async def search_for_stock_videos(query: str, limit: int, min_dur: int) -> list[str]:
@@ -10,7 +12,7 @@ async def search_for_stock_videos(query: str, limit: int, min_dur: int) -> list[
 
     qurl = f"https://api.pexels.com/videos/search?query={query}&per_page={limit}"
 
-    r = requests.get(qurl, headers=headers)
+    r = await asyncio.to_thread(requests_session.get, qurl, headers=headers)
     response = r.json()
 
     raw_urls = []
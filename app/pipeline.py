@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from pydantic import BaseModel
+
+StageFn = Callable[..., Awaitable[Any]]
+
+
+class StageTiming(BaseModel):
+    name: str
+    deps: list[str] = []
+
+    started_at: float = 0
+    """ seconds since the pipeline started """
+
+    finished_at: float = 0
+    """ seconds since the pipeline started """
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+class PipelineReport(BaseModel):
+    """wall time of every stage of a run and the chain that bounded it"""
+
+    stages: list[StageTiming] = []
+    total_seconds: float = 0
+    critical_path: list[str] = []
+
+    def stage_seconds(self) -> dict[str, float]:
+        return {stage.name: round(stage.duration, 3) for stage in self.stages}
+
+
+class Stage:
+    def __init__(self, name: str, fn: StageFn, deps: list[str]):
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+
+
+class Pipeline:
+    """Runs the stages of an engine as a dependency DAG.
+
+    A stage is an async function that gets the results of its dependencies
+    as keyword arguments named after them. Every stage starts as soon as its
+    dependencies are done, so independent stages run concurrently and the
+    run takes about as long as its longest dependency chain.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: dict[str, Stage] = {}
+        self.report = PipelineReport()
+
+    def add(self, name: str, fn: StageFn, deps: list[str] | None = None):
+        if name in self.stages:
+            raise ValueError(f"stage {name} is already defined")
+        self.stages[name] = Stage(name, fn, deps or [])
+
+    def validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"stage {stage.name} depends on unknown stage {dep}")
+
+        # kahn's algorithm, anything left over sits on a cycle
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+        if remaining:
+            raise ValueError(f"stages {sorted(remaining)} form a cycle")
+
+    async def run(self) -> dict[str, Any]:
+        self.validate()
+
+        results: dict[str, Any] = {}
+        timings: dict[str, StageTiming] = {}
+        running: dict[asyncio.Task, str] = {}
+        started = time.perf_counter()
+
+        async def run_stage(stage: Stage):
+            timing = timings[stage.name]
+            timing.started_at = time.perf_counter() - started
+            try:
+                kwargs = {dep: results[dep] for dep in stage.deps}
+                return await stage.fn(**kwargs)
+            finally:
+                timing.finished_at = time.perf_counter() - started
+
+        def launch_ready():
+            for stage in self.stages.values():
+                if stage.name in timings:
+                    continue
+                if all(dep in results for dep in stage.deps):
+                    timings[stage.name] = StageTiming(name=stage.name, deps=stage.deps)
+                    task = asyncio.create_task(run_stage(stage))
+                    running[task] = stage.name
+
+        launch_ready()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = running.pop(task)
+                    results[name] = task.result()
+                    logger.debug(
+                        f"[{self.name}] stage {name} done in {round(timings[name].duration, 2)}s"
+                    )
+                launch_ready()
+        finally:
+            # a failed stage cancels everything still in flight
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+            self.report = PipelineReport(
+                stages=sorted(timings.values(), key=lambda t: t.started_at),
+                total_seconds=time.perf_counter() - started,
+                critical_path=self.critical_path(timings),
+            )
+            self.log_report()
+
+        return results
+
+    def critical_path(self, timings: dict[str, StageTiming]) -> list[str]:
+        """walks back from the last stage to finish through the dependency
+        that finished last, ie. the one the stage was waiting on"""
+        finished = [t for t in timings.values() if t.finished_at]
+        if not finished:
+            return []
+
+        path = []
+        current: StageTiming | None = max(finished, key=lambda t: t.finished_at)
+        while current:
+            path.append(current.name)
+            deps = [timings[dep] for dep in current.deps if dep in timings]
+            current = max(deps, key=lambda t: t.finished_at) if deps else None
+
+        return list(reversed(path))
+
+    def log_report(self):
+        lines = [
+            f"  {t.name:<16} {round(t.started_at, 2):>8}s -> {round(t.finished_at, 2):>8}s ({round(t.duration, 2)}s)"
+            for t in self.report.stages
+        ]
+        logger.info(
+            f"[{self.name}] pipeline took {round(self.report.total_seconds, 2)}s, "
+            f"critical path: {' -> '.join(self.report.critical_path)}\n" + "\n".join(lines)
+        )
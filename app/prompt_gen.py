@@ -1,8 +1,6 @@
 import random
 import typing
-from typing import Literal
-from app.utils.strings import log_attempt_number
-from langchain_community.cache import SQLiteCache
+from typing import AsyncIterator, Literal
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.globals import set_llm_cache
@@ -11,8 +9,8 @@ from langchain_openai import ChatOpenAI
 from loguru import logger
 from pydantic import BaseModel, Field
 from app.config import settings
-from tenacity import retry, stop_after_attempt, wait_fixed
 from app.config import llm_cache_path
+from app.llm_cache import LLMCache
 
 
 
@@ -50,12 +48,50 @@ class StoryMiscResponse(BaseModel):
     )
 
 
+class PlannedSentence(BaseModel):
+    """one sentence of a planned voiceover"""
+
+    text: str = Field(description="The sentence of the voiceover")
+    search_terms: list[str] = Field(
+        [], description="1-2 pexels.com search terms for a background video of the sentence"
+    )
+    image_prompt: str = Field(
+        "", description="A MidJourney style description of the scene for the sentence"
+    )
+
+
+class ReelPlan(StoryMiscResponse):
+    """everything needed to make a reel, generated in one call"""
+
+    sentences: list[PlannedSentence] = Field(
+        [], description="The voiceover split into sentences, in order"
+    )
+
+    @property
+    def script(self) -> str:
+        return " ".join(sentence.text.strip() for sentence in self.sentences)
+
+    def search_terms(self) -> list[str]:
+        terms = [
+            term.replace("#", "").strip()
+            for sentence in self.sentences
+            for term in sentence.search_terms
+        ]
+        return list(dict.fromkeys(term for term in terms if term))
+
+
 StoryPromptType = Literal["fantasy story", "motivational quote"] | str
 
 
 class PromptGenerator:
     def __init__(self, test_mode: bool = False):
-        set_llm_cache(SQLiteCache(database_path=f"{llm_cache_path}/llm_cache.db"))
+        set_llm_cache(
+            LLMCache(
+                db_path=f"{llm_cache_path}/llm_cache.db",
+                ttl=settings.LLM_CACHE_TTL,
+                similarity=settings.LLM_CACHE_SIMILARITY,
+            )
+        )
 
         self.test_mode = test_mode
         self.model = ChatOpenAI(model=settings.OPENAI_MODEL_NAME)
@@ -86,8 +122,10 @@ Your response must only contain the voice over text without parenthesis or music
             ]
         )
 
-        self.model.temperature = random.uniform(0.5, 1.2)
-        chain = prompt | self.model | StrOutputParser()
+        # the temperature is left out of the cache key, so repeated prompts
+        # are served from the cache and only new ones get a random one
+        model = self.model.bind(temperature=random.uniform(0.5, 1.2))
+        chain = prompt | model | StrOutputParser()
 
         logger.debug(f"Generating sentence from prompt: {sentence_prompt}")
 
@@ -105,10 +143,7 @@ Your response must only contain the voice over text without parenthesis or music
             }
         )
 
-    # depreciated
-    async def generate_sentence(self, sentence: str) -> str:
-        """generates a sentence from a prompt"""
-
+    def sentence_chain(self):
         tmpl = """
 You are a motivational reels narrator, you must generate a motivational quote in a narrative format for the sentence below, and your response must be short and conscience:
 
@@ -118,11 +153,63 @@ You are a motivational reels narrator, you must generate a motivational quote in
 
         prompt = ChatPromptTemplate.from_template(tmpl)
 
-        chain = prompt | self.model | StrOutputParser()
+        return prompt | self.model | StrOutputParser()
+
+    # depreciated
+    async def generate_sentence(self, sentence: str) -> str:
+        """generates a sentence from a prompt"""
+
+        chain = self.sentence_chain()
 
         logger.debug(f"Generating sentence from prompt: {sentence}")
         return await chain.ainvoke({"sentence": sentence})
 
+    async def stream_sentence(self, sentence: str) -> AsyncIterator[str]:
+        """same as generate_sentence but yields the completion as it's generated"""
+
+        chain = self.sentence_chain()
+
+        logger.debug(f"Streaming sentence from prompt: {sentence}")
+        async for chunk in chain.astream({"sentence": sentence}):
+            yield chunk
+
+    async def generate_reel_plan(self, sentence: str) -> ReelPlan:
+        """generates the script, per-sentence search terms/image prompts and the
+        post info in a single call, instead of chaining generate_sentence,
+        generate_stock_image_keywords and generate_video_misc_info"""
+
+        system_template = """
+You are a motivational reels narrator, you must generate a motivational quote in a narrative format for the sentence below, and your response must be short and conscience.
+
+Split the quote into its sentences. For each sentence also generate:
+- pexels.com search terms for a background video, the search keywords will be used to query an API. eg: Timing and letting go, Weakness and strength, Focus and hustle, Resonate with life
+- a vivid description of the scene for an image generator, using keywords and descriptive phrases rather than full sentences
+
+Then generate a hook, a social media post title and hashtags for the whole quote.
+
+{format_instructions}
+
+[(sentence)]:
+{sentence}
+ """
+
+        parser = PydanticOutputParser(pydantic_object=ReelPlan)
+        prompt = ChatPromptTemplate.from_messages(messages=[("system", system_template)])
+        prompt = prompt.partial(format_instructions=parser.get_format_instructions())
+
+        chain = prompt | self.model | parser
+
+        logger.debug(f"Generating reel plan from prompt: {sentence}")
+        plan = typing.cast(ReelPlan, await chain.ainvoke({"sentence": sentence}))
+
+        if not plan.sentences:
+            raise ValueError("Reel plan has no sentences")
+
+        for planned in plan.sentences:
+            planned.text = planned.text.replace('"', "")
+        plan.hashtags = [tag.replace("#", "") for tag in plan.hashtags]
+        return plan
+
     async def generate_stock_image_keywords(self, sentence: str) -> HashtagsSchema:
         """generates search keywords from a sentence"""
 
@@ -149,12 +236,21 @@ Timing and letting go, Weakness and strength, Focus and hustle, Resonate with li
         logger.debug(f"Generating sentence from prompt: {sentence}")
         return await chain.ainvoke({"sentence": sentence})
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(5), after=log_attempt_number) # type: ignore
     async def sentences_to_images(
         self,
         sentences: list[str],
         style: str,
+        chunk_size: int = 8,
+        context_size: int = 2,
+        max_attempts: int = 3,
     ) -> ImagePromptResponses:
+        """generates an image prompt per sentence.
+
+        long stories are split into chunks of `chunk_size` sentences that are
+        generated concurrently, each chunk sees the `context_size` sentences
+        before it to keep the narrative consistent. chunks that fail or come
+        back with the wrong count are retried on their own.
+        """
         user_template = """
 You are a master of crafting detailed visual narratives. Your task is to generate descriptions of scenes for an animator, based on a story. Each scene description will guide the animator in creating the corresponding visual frames for the video.
 Respond only with vivid, intricate descriptions of the scenes. Focus exclusively on providing the animator with everything they need to visualize characters, locations, and concepts clearly and consistently.
@@ -174,6 +270,9 @@ The visual narrative should be rich and immersive, allowing the animator to seam
 
 {format_instructions}
 
+[(Previous paragraphs, for context only, do not describe them)]:
+{context}
+
 [(Paragraphs)]:
 {sentences}
 
@@ -182,29 +281,64 @@ You must generate a total of {total_count} descriptions, each preserving a coher
 
         parser = PydanticOutputParser(pydantic_object=ImageLLMResponse)
 
-        formated_sentences = "- " + "\n- ".join(sentences)
-
         prompt = ChatPromptTemplate.from_messages(messages=[("system", user_template)])
-        prompt = prompt.partial(
-            format_instructions=parser.get_format_instructions(),
-            total_count=len(sentences),
-        )
+        prompt = prompt.partial(format_instructions=parser.get_format_instructions())
 
         chain = prompt | self.model | parser
 
-        logger.debug("Generating image prompts")
-        data = await chain.ainvoke({"sentences": formated_sentences, "style": style})
+        def format_sentences(items: list[str]) -> str:
+            return "- " + "\n- ".join(items) if items else "None"
+
+        starts = list(range(0, len(sentences), max(1, chunk_size)))
+        chunks = [sentences[start : start + chunk_size] for start in starts]
+        inputs = [
+            {
+                "sentences": format_sentences(chunk),
+                "context": format_sentences(sentences[max(0, start - context_size) : start]),
+                "total_count": len(chunk),
+                "style": style,
+            }
+            for start, chunk in zip(starts, chunks)
+        ]
+
+        results: list[list[str] | None] = [None] * len(chunks)
+
+        for attempt in range(1, max_attempts + 1):
+            pending = [i for i, result in enumerate(results) if result is None]
+            if not pending:
+                break
 
-        if len(data.image_prompts) != len(sentences):
+            logger.debug(
+                f"Generating image prompts for {len(pending)} chunks (attempt {attempt})"
+            )
+            outputs = await chain.abatch(
+                [inputs[i] for i in pending], return_exceptions=True
+            )
+
+            for i, output in zip(pending, outputs):
+                if isinstance(output, Exception):
+                    logger.error(f"Image prompt chunk {i} failed: {output}")
+                    continue
+
+                if len(output.image_prompts) != len(chunks[i]):
+                    logger.error(
+                        f"Image prompt chunk {i}: expected {len(chunks[i])} image prompts, got {len(output.image_prompts)}"
+                    )
+                    continue
+
+                results[i] = output.image_prompts
+
+        failed = [i for i, result in enumerate(results) if result is None]
+        if failed:
             raise ValueError(
-                f"Expected {len(sentences)} image prompts, got {len(data.image_prompts)}"
+                f"Failed to generate image prompts for chunks {failed} after {max_attempts} attempts"
             )
 
-        logger.info(f"Generated {len(data.image_prompts)} image prompts")
-        logger.debug(f"image prompts: {data.image_prompts}")
-        return ImagePromptResponses(
-            sentences=sentences, image_prompts=data.image_prompts
-        )
+        image_prompts = [prompt for result in results for prompt in result]  # type: ignore
+
+        logger.info(f"Generated {len(image_prompts)} image prompts")
+        logger.debug(f"image prompts: {image_prompts}")
+        return ImagePromptResponses(sentences=sentences, image_prompts=image_prompts)
 
     async def generate_video_misc_info(self, script: str) -> StoryMiscResponse:
         """generates video misc info from a script"""
@@ -11,12 +11,19 @@ from app.base import (
     StartResponse,
     TempData,
 )
+from app.pipeline import Pipeline
+from app.prompt_gen import PlannedSentence, ReelPlan, StoryMiscResponse
+from app.script_stream import SentenceStream
 from app.utils.strings import split_by_dot_or_newline
 from app.utils.path_util import download_resource
 
 
 class ReelsMakerConfig(BaseGeneratorConfig):
-    pass
+    stream_script: bool = False
+    """ stream the script from the llm and start speech/footage per sentence """
+
+    single_plan_call: bool = True
+    """ get the script, search terms and post info from one llm call """
 
 
 def create_concat_file(clips):
@@ -61,6 +68,7 @@ class ReelsMaker(BaseEngine):
         super().__init__(config)
 
         self.config = config
+        self.plan: ReelPlan | None = None
 
         logger.info(f"Starting Reels Maker with: {self.config.model_dump()}")
 
@@ -80,14 +88,14 @@ class ReelsMaker(BaseEngine):
         logger.info(f"Generated search terms: {tags}")
         return tags
 
-    async def start(self) -> StartResponse:
-        await super().start()
-
+    async def prepare_music(self) -> str | None:
         if self.config.background_audio_url:
-            self.background_music_path = await download_resource(
+            self.video_generator.config.background_music_path = await download_resource(
                 self.cwd, self.config.background_audio_url
             )
+        return self.video_generator.config.background_music_path
 
+    async def prepare_script(self) -> str:
         # generate script from prompt
         if self.config.prompt:
             script = await self.generate_script(self.config.prompt)
@@ -96,75 +104,91 @@ class ReelsMaker(BaseEngine):
         else:
             raise ValueError("No prompt or sentence provided")
 
-        # split script into sentences
         assert script is not None, "Script should not be None"
+        return script
+
+    async def prepare_plan(self) -> ReelPlan:
+        if self.config.prompt and self.config.single_plan_call:
+            try:
+                self.plan = await self.prompt_generator.generate_reel_plan(
+                    self.config.prompt
+                )
+                return self.plan
+            except Exception as e:
+                logger.warning(f"Reel plan failed, using chained prompts: {e}")
+
+        # no search terms in the plan, the videos stage asks for them
+        script = await self.prepare_script()
+        self.plan = ReelPlan(sentences=[PlannedSentence(text=script)])
+        return self.plan
 
-        sentences = split_by_dot_or_newline(script, 100)
-        sentences = list(filter(lambda x: x != "", sentences))
+    async def split_sentences(self, plan: ReelPlan) -> list[str]:
+        sentences = split_by_dot_or_newline(plan.script, 100)
+        return list(filter(lambda x: x != "", sentences))
 
-        video_paths = []
+    async def prepare_videos(self, plan: ReelPlan) -> list[str]:
         if self.config.video_paths:
             logger.info("Using video paths from client...")
-            video_paths = self.config.video_paths
+            return self.config.video_paths
+
+        search_terms = plan.search_terms()
+        if search_terms:
+            logger.info(f"Using search terms from the plan: {search_terms}")
         else:
-            logger.debug("Generating search terms for script...")
             search_terms = await self.generate_search_terms(
-                script=script, max_hashtags=10
+                script=plan.script, max_hashtags=10
             )
 
-            # holds all remote urls
-            remote_urls = []
-
-            max_videos = int(os.getenv("MAX_BG_VIDEOS", 10))
-
-            for search_term in search_terms[:max_videos]:
-                # search for a related background video
-                video_path = await self.video_generator.get_video_url(
-                    search_term=search_term
-                )
-                if not video_path:
-                    continue
-
-                remote_urls.append(video_path)
-
-            # download all remote videos at once
-            tasks = []
-            for url in remote_urls:
-                task = asyncio.create_task(download_resource(self.cwd, url))
-                tasks.append(task)
-
-            local_paths = await asyncio.gather(*tasks)
-            video_paths.extend(set(local_paths))
+        max_videos = int(os.getenv("MAX_BG_VIDEOS", 10))
+        video_paths = await self.fetch_videos(search_terms[:max_videos])
 
         if len(video_paths) == 0:
             raise ValueError("No video paths found available")
+        return video_paths
+
+    async def fetch_videos(self, search_terms: list[str]) -> list[str]:
+        # search for a related background video for every term at once
+        urls = await asyncio.gather(
+            *[
+                self.video_generator.get_video_url(search_term=search_term)
+                for search_term in search_terms
+            ]
+        )
+        remote_urls = [url for url in urls if url]
 
-        data: list[TempData] = []
+        # download all remote videos at once
+        local_paths = await asyncio.gather(
+            *[download_resource(self.cwd, url) for url in remote_urls]
+        )
+        return list(set(local_paths))
 
+    async def synth_sentences(self, sentences: list[str]) -> list[FileClip]:
         # for each sentence, generate audio
+        clips = []
         for sentence in sentences:
             audio_path = await self.synth_generator.synth_speech(sentence)
-            data.append(
-                TempData(
-                    synth_clip=FileClip(audio_path),
-                )
-            )
+            clips.append(FileClip(audio_path))
+        return clips
 
-        # TODO: fix me
-        self.video_generator.config.background_music_path = self.background_music_path
-
-        final_speech = ffmpeg.concat(
-            *[item.synth_clip.ffmpeg_clip for item in data], v=0, a=1
-        )
-
-        # get subtitles from script
-        subtitles_path = await self.subtitle_generator.generate_subtitles(
+    async def prepare_subtitles(
+        self, sentences: list[str], speech: list[FileClip]
+    ) -> str:
+        return await self.subtitle_generator.generate_subtitles(
             sentences=sentences,
-            durations=[item.synth_clip.real_duration for item in data],
+            durations=[clip.real_duration for clip in speech],
         )
 
+    async def render(
+        self,
+        music: str | None,
+        speech: list[FileClip],
+        subtitles: str,
+        videos: list[str],
+    ) -> StartResponse:
+        final_speech = ffmpeg.concat(*[clip.ffmpeg_clip for clip in speech], v=0, a=1)
+
         # the max duration of the final video
-        video_duration = sum(item.synth_clip.real_duration for item in data)
+        video_duration = sum(clip.real_duration for clip in speech)
 
         # each clip should be 5 seconds long
         max_clip_duration = 5
@@ -172,7 +196,7 @@ class ReelsMaker(BaseEngine):
         tot_dur: float = 0
 
         temp_videoclip: list[FileClip] = [
-            FileClip(video_path, t=max_clip_duration) for video_path in video_paths
+            FileClip(video_path, t=max_clip_duration) for video_path in videos
         ]
 
         final_clips: list[FileClip] = []
@@ -197,7 +221,7 @@ class ReelsMaker(BaseEngine):
 
         final_video_path = await self.video_generator.generate_video(
             clips=final_clips,
-            subtitles_path=subtitles_path,
+            subtitles_path=subtitles,
             speech_filter=final_speech,
             video_duration=video_duration,
         )
@@ -207,4 +231,108 @@ class ReelsMaker(BaseEngine):
 
         return StartResponse(
             video_file_path=final_video_path,
-        )
\ No newline at end of file
+        )
+
+    async def open_script_stream(self) -> SentenceStream:
+        if not self.config.prompt:
+            raise ValueError("Streaming the script needs a prompt")
+
+        logger.debug(f"Streaming script from prompt: {self.config.prompt}")
+        return SentenceStream(
+            self.prompt_generator.stream_sentence(self.config.prompt),
+            min_char_len=100,
+        )
+
+    async def collect_sentences(self, script_stream: SentenceStream) -> list[str]:
+        try:
+            return list(await script_stream.join())
+        finally:
+            script_stream.cancel()
+
+    async def synth_streamed_sentences(
+        self, script_stream: SentenceStream
+    ) -> list[FileClip]:
+        clips = []
+        async for sentence in script_stream:
+            audio_path = await self.synth_generator.synth_speech(sentence)
+            clips.append(FileClip(audio_path))
+        return clips
+
+    async def prepare_streamed_videos(self, script_stream: SentenceStream) -> list[str]:
+        if self.config.video_paths:
+            logger.info("Using video paths from client...")
+            return self.config.video_paths
+
+        max_videos = int(os.getenv("MAX_BG_VIDEOS", 10))
+        seen_terms: set[str] = set()
+
+        async def fetch_for_sentence(sentence: str) -> list[str]:
+            terms = await self.generate_search_terms(script=sentence, max_hashtags=2)
+
+            new_terms = []
+            for term in terms:
+                if term.lower() in seen_terms or len(seen_terms) >= max_videos:
+                    continue
+                seen_terms.add(term.lower())
+                new_terms.append(term)
+
+            return await self.fetch_videos(new_terms)
+
+        # every sentence starts its own search as soon as it's streamed
+        tasks = [
+            asyncio.create_task(fetch_for_sentence(sentence))
+            async for sentence in script_stream
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        video_paths = list(dict.fromkeys(path for paths in results for path in paths))
+        if len(video_paths) == 0:
+            raise ValueError("No video paths found available")
+        return video_paths
+
+    def build_streaming_pipeline(self) -> Pipeline:
+        # speech and footage start on the first sentence while the llm is
+        # still writing the rest of the script
+        pipeline = Pipeline(self.config.job_id)
+        pipeline.add("music", self.prepare_music)
+        pipeline.add("script_stream", self.open_script_stream)
+        pipeline.add("sentences", self.collect_sentences, deps=["script_stream"])
+        pipeline.add("videos", self.prepare_streamed_videos, deps=["script_stream"])
+        pipeline.add("speech", self.synth_streamed_sentences, deps=["script_stream"])
+        pipeline.add("subtitles", self.prepare_subtitles, deps=["sentences", "speech"])
+        pipeline.add(
+            "render", self.render, deps=["music", "speech", "subtitles", "videos"]
+        )
+        return pipeline
+
+    def build_pipeline(self) -> Pipeline:
+        if self.config.stream_script and self.config.prompt:
+            return self.build_streaming_pipeline()
+
+        # stock footage search and download don't wait on the speech, and the
+        # speech doesn't wait on the search terms
+        pipeline = Pipeline(self.config.job_id)
+        pipeline.add("music", self.prepare_music)
+        pipeline.add("plan", self.prepare_plan)
+        pipeline.add("sentences", self.split_sentences, deps=["plan"])
+        pipeline.add("videos", self.prepare_videos, deps=["plan"])
+        pipeline.add("speech", self.synth_sentences, deps=["sentences"])
+        pipeline.add("subtitles", self.prepare_subtitles, deps=["sentences", "speech"])
+        pipeline.add(
+            "render", self.render, deps=["music", "speech", "subtitles", "videos"]
+        )
+        return pipeline
+
+    async def start(self) -> StartResponse:
+        await super().start()
+        response = await self.run_pipeline(self.build_pipeline())
+
+        if self.plan and (self.plan.hook_title or self.plan.hashtags):
+            response.post_info = StoryMiscResponse.model_validate(
+                self.plan.model_dump(include={"hook_title", "post_title", "hashtags"})
+            )
+        return response
@@ -0,0 +1,77 @@
+import asyncio
+from typing import AsyncIterator
+
+from loguru import logger
+
+from app.utils.strings import SentenceSplitter
+
+
+class SentenceStream:
+    """Turns a streamed LLM completion into sentences several consumers can read.
+
+    The completion is read by a background task; every consumer iterating the
+    stream gets every sentence in order, waiting for the next one while the
+    LLM is still generating.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str], min_char_len: int = 80):
+        self.splitter = SentenceSplitter(min_char_len)
+        self.sentences: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+
+        self._changed = asyncio.Condition()
+        self._task = asyncio.create_task(self._produce(chunks))
+
+    async def _produce(self, chunks: AsyncIterator[str]):
+        try:
+            async for chunk in chunks:
+                await self._push(self.splitter.feed(chunk.replace('"', "")))
+            await self._push(self.splitter.flush())
+        except BaseException as e:
+            self.error = e
+            raise
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def _push(self, sentences: list[str]):
+        if not sentences:
+            return
+
+        async with self._changed:
+            for sentence in sentences:
+                logger.debug(f"Streamed sentence {len(self.sentences)}: {sentence}")
+                self.sentences.append(sentence)
+            self._changed.notify_all()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: index < len(self.sentences) or self.done
+                )
+                if index < len(self.sentences):
+                    sentence = self.sentences[index]
+                elif self.error:
+                    raise RuntimeError("script stream failed") from self.error
+                else:
+                    return
+
+            index += 1
+            yield sentence
+
+    async def join(self) -> list[str]:
+        """waits for the completion to finish and returns every sentence"""
+        await self._task
+        return self.sentences
+
+    def cancel(self):
+        if not self._task.done():
+            self._task.cancel()
+
+    @property
+    def script(self) -> str:
+        return " ".join(self.sentences)
@@ -1,4 +1,4 @@
-import asyncio
+import json
 import os
 
 import ffmpeg
@@ -10,15 +10,23 @@ from app.base import (
     FileClip,
     StartResponse,
     TempData,
-    VideoAssetCacheItem,
 )
-from app.config import audios_cache_path, images_cache_path
+from app.config import audios_cache_path, projects_cache_path
+from app.effects import zoom_in_effect, zoom_out_effect
+from app.manifest import AssetManifest
+from app.pipeline import Pipeline
 from app.utils.strings import get_clip_duration, split_by_dot_or_newline
-from app.utils.path_util import download_resource
+from app.utils.path_util import download_resource, text_to_sha256_hash
 
 
 class StoryTellerConfig(BaseGeneratorConfig):
-    pass
+    project_id: str | None = None
+    """ assets of every sentence are kept per project, re-running a project
+    only regenerates the sentences that changed. defaults to the job id """
+
+    incremental_render: bool = True
+    """ render every sentence to its own segment and stitch them, so unchanged
+    sentences are not re-encoded """
 
 
 class StoryTeller(BaseEngine):
@@ -32,20 +40,22 @@ class StoryTeller(BaseEngine):
         self.audio_clip_paths = []
         self.final_speech_path = ""
 
-    async def start(self) -> StartResponse:
-        await super().start()
+        project_id = config.project_id or config.job_id
+        self.manifest = AssetManifest(
+            os.path.join(projects_cache_path, project_id), project_id
+        )
+        self.manifest.set_style(config.image_gen_config.style)
 
+    async def prepare_music(self) -> str | None:
         if self.config.background_audio_url:
             self.config.video_gen_config.background_music_path = (
                 await download_resource(
                     self.cwd, self.config.background_audio_url, audios_cache_path
                 )
             )
+        return self.config.video_gen_config.background_music_path
 
-        logger.info(
-            f"Starting story teller with: {self.config.model_dump_json(indent=3)}"
-        )
-
+    async def split_sentences(self) -> list[str]:
         script = self.config.script
         script = script.strip()  # type: ignore
         sentences = split_by_dot_or_newline(script, 80)
@@ -53,90 +63,192 @@ class StoryTeller(BaseEngine):
             sentence.replace("\n", "").replace("\n", " ").replace("\\", "").strip()
             for sentence in sentences
         ]
+        self.sentences = sentences
+        return sentences
+
+    async def prepare_image_prompts(self, sentences: list[str]) -> list[str]:
+        # only sentences the manifest has no prompt for go to the llm
+        missing = list(
+            dict.fromkeys(s for s in sentences if not self.manifest.get(s).image_prompt)
+        )
+        logger.debug(
+            f"{len(sentences) - len(missing)} image prompts from the manifest, generating {len(missing)}"
+        )
 
-        new_sentences = []
-        image_prompts = []
-
-        cached: list[VideoAssetCacheItem] = []
-
-        for i, sentence in enumerate(sentences):
-            if i < len(cached):  # Check if there is a corresponding cached item
-                cached_item = cached[i]
-                # TODO: check similarity with score 99%
-                if cached_item.sentence == sentence:
-                    new_sentences.append(cached_item.sentence)
-                    image_prompts.append(cached_item.image_prompt)
-                else:
-                    logger.debug(f"new sentence (not in cache): {sentence}")
-                    new_sentences.append(sentence)
-            else:
-                logger.debug(f"new sentence (no cache available): {sentence}")
-                new_sentences.append(sentence)
-
-        if len(image_prompts) == 0 or len(new_sentences) != len(image_prompts):
-            logger.debug("generating new image prompts")
+        if missing:
             image_resp = await self.prompt_generator.sentences_to_images(
-                sentences=new_sentences,
+                sentences=missing,
                 style=self.config.image_gen_config.style,
             )
-
-            image_prompts = image_resp.image_prompts
-
-        # generate image for each sentence and audio
-        data: list[TempData] = []
-
-        # all cached assets we need to re-transform their urls
-        cache_items: list[VideoAssetCacheItem] = []
-
+            for sentence, image_prompt in zip(missing, image_resp.image_prompts):
+                self.manifest.get(sentence).image_prompt = image_prompt
+            self.manifest.save()
+
+        return [self.manifest.get(sentence).image_prompt for sentence in sentences]
+
+    async def synth_sentences(self, sentences: list[str]) -> list[str]:
+        speech_paths = []
+        for sentence in sentences:
+            speech_path = await self.synth_generator.synth_speech(sentence)
+            self.manifest.get(sentence).tts_speech_url = speech_path
+            self.manifest.save()
+            speech_paths.append(speech_path)
+        return speech_paths
+
+    async def generate_images(
+        self, sentences: list[str], image_prompts: list[str]
+    ) -> list[str]:
         # for generated image prompts, use the prompt to generate an image
-        for i, (image_prompt, sentence) in enumerate(zip(image_prompts, new_sentences)):
-            speech_path, image_path = await asyncio.gather(
-                self.synth_generator.synth_speech(sentence),
-                self.image_generator.generate_image(
+        image_paths = []
+        for image_prompt, sentence in zip(image_prompts, sentences):
+            item = self.manifest.get(sentence)
+            if not item.media_url or not os.path.exists(item.media_url):
+                item.media_url = await self.image_generator.generate_image(
                     prompt=image_prompt, sentence=sentence
-                ),
-            )
-
-            speech_duration = get_clip_duration(speech_path)
-            data.append(
-                TempData(
-                    synth_clip=FileClip(speech_path),
-                    media_clip=FileClip(image_path, loop=1, t=speech_duration),
                 )
+                self.manifest.save()
+            image_paths.append(item.media_url)
+
+        if self.image_generator.matches:
+            logger.info(
+                f"Reused {len(self.image_generator.matches)} of {len(image_paths)} images from similar prompts"
             )
+        return image_paths
 
-            image_path = os.path.join(images_cache_path, image_path)
+    async def prepare_subtitles(self, sentences: list[str], speech: list[str]) -> str:
+        return await self.subtitle_generator.generate_subtitles(
+            sentences=sentences,
+            durations=[get_clip_duration(speech_path) for speech_path in speech],
+        )
 
-            cache_items.append(
-                VideoAssetCacheItem(
-                    image_prompt=image_prompt,
-                    media_url=image_path,
-                    sentence=sentence,
-                    tts_speech_url=speech_path,
+    def segment_effect(self, sentence: str):
+        """the zoom of a sentence, picked from its text so a re-render of the
+        same sentence reuses its segment"""
+        if self.config.video_type == "motivational":
+            return None
+        effects = [zoom_out_effect, zoom_in_effect]
+        return effects[int(text_to_sha256_hash(sentence), 16) % len(effects)]
+
+    async def render_segments(
+        self, sentences: list[str], speech: list[str], images: list[str]
+    ) -> list[str]:
+        segment_paths = []
+        rendered = 0
+
+        for sentence, speech_path, image_path in zip(sentences, speech, images):
+            duration = get_clip_duration(speech_path)
+            effect = self.segment_effect(sentence)
+            video_config = self.video_generator.config
+
+            # everything that changes the pixels of the segment
+            key = text_to_sha256_hash(
+                json.dumps(
+                    [
+                        image_path,
+                        duration,
+                        effect.__name__ if effect else None,
+                        self.config.video_type,
+                        video_config.color_effect,
+                        video_config.fps,
+                    ]
                 )
             )
+            segment_path = os.path.join(self.manifest.segments_dir, f"{key}.mp4")
+
+            if not os.path.exists(segment_path):
+                # rendered under another name so a crash never leaves a
+                # truncated segment behind
+                tmp_path = os.path.join(self.manifest.segments_dir, f"{key}.part.mp4")
+                await self.video_generator.render_segment(
+                    FileClip(image_path, loop=1, t=duration), tmp_path, effect
+                )
+                os.replace(tmp_path, segment_path)
+                rendered += 1
+
+            self.manifest.get(sentence).segment_path = segment_path
+            self.manifest.save()
+            segment_paths.append(segment_path)
 
-        # generate subtitles
-        subtitles_path = await self.subtitle_generator.generate_subtitles(
-            sentences=new_sentences,
-            durations=[item.synth_clip.real_duration for item in data],
+        logger.info(
+            f"Rendered {rendered} segments, reused {len(segment_paths) - rendered}"
         )
+        return segment_paths
+
+    async def render(
+        self,
+        music: str | None,
+        sentences: list[str],
+        image_prompts: list[str],
+        speech: list[str],
+        images: list[str],
+        subtitles: str,
+    ) -> StartResponse:
+        speech_clips = [FileClip(speech_path) for speech_path in speech]
 
         # merge all audio clips into one
-        max_video_duration = sum(item.synth_clip.real_duration for item in data)
+        max_video_duration = sum(clip.real_duration for clip in speech_clips)
 
         logger.debug(f"video duration: {round(max_video_duration / 60, 1)}mins")
 
         # merge all audios
         final_speech = ffmpeg.concat(
-            *[item.synth_clip.ffmpeg_clip for item in data], v=0, a=1
-        )
-        output_path = await self.video_generator.generate_video(
-            clips=[item.media_clip for item in data],  # type: ignore
-            subtitles_path=subtitles_path,
-            speech_filter=final_speech,
-            video_duration=max_video_duration,
+            *[clip.ffmpeg_clip for clip in speech_clips], v=0, a=1
         )
+
+        if self.config.incremental_render:
+            segment_paths = await self.render_segments(sentences, speech, images)
+            output_path = await self.video_generator.stitch_segments(
+                segment_paths=segment_paths,
+                speech_filter=final_speech,
+                subtitles_path=subtitles,
+                video_duration=max_video_duration,
+            )
+        else:
+            data = [
+                TempData(
+                    synth_clip=speech_clip,
+                    media_clip=FileClip(image_path, loop=1, t=speech_clip.real_duration),
+                )
+                for speech_clip, image_path in zip(speech_clips, images)
+            ]
+            output_path = await self.video_generator.generate_video(
+                clips=[item.media_clip for item in data],  # type: ignore
+                subtitles_path=subtitles,
+                speech_filter=final_speech,
+                video_duration=max_video_duration,
+            )
+
+        # sentences edited out of the script are dropped once the render is done
+        self.manifest.prune(sentences)
+        self.manifest.save()
+
         return StartResponse(
             video_file_path=output_path,
-        )
\ No newline at end of file
+        )
+
+    def build_pipeline(self) -> Pipeline:
+        # speech is synthesized while the llm writes the image prompts
+        pipeline = Pipeline(self.config.job_id)
+        pipeline.add("music", self.prepare_music)
+        pipeline.add("sentences", self.split_sentences)
+        pipeline.add("image_prompts", self.prepare_image_prompts, deps=["sentences"])
+        pipeline.add("speech", self.synth_sentences, deps=["sentences"])
+        pipeline.add(
+            "images", self.generate_images, deps=["sentences", "image_prompts"]
+        )
+        pipeline.add("subtitles", self.prepare_subtitles, deps=["sentences", "speech"])
+        pipeline.add(
+            "render",
+            self.render,
+            deps=["music", "sentences", "image_prompts", "speech", "images", "subtitles"],
+        )
+        return pipeline
+
+    async def start(self) -> StartResponse:
+        await super().start()
+
+        logger.info(
+            f"Starting story teller with: {self.config.model_dump_json(indent=3)}"
+        )
+
+        return await self.run_pipeline(self.build_pipeline())
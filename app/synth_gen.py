@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 from typing import Literal
@@ -12,6 +13,7 @@ from pydantic import BaseModel
 
 from app import tiktokvoice
 from app.config import speech_cache_path
+from app.utils.http import get_httpx_client
 from app.utils.path_util import search_file, text_to_sha256_hash
 from tenacity import retry, stop_after_attempt, wait_fixed
 
@@ -62,16 +64,24 @@ class SynthGenerator:
             ),
         )
 
-        audio = self.client.generate(
-            text=text, voice=voice, model="eleven_multilingual_v2", stream=False
-        )
+        def generate():
+            audio = self.client.generate(
+                text=text, voice=voice, model="eleven_multilingual_v2", stream=False
+            )
+            save(audio, self.speech_path)
 
-        save(audio, self.speech_path)
+        # the elevenlabs client is blocking
+        await asyncio.to_thread(generate)
 
         return self.speech_path
 
     async def generate_with_tiktok(self, text: str) -> str:
-        tiktokvoice.tts(text, voice=str(self.config.voice), filename=self.speech_path)
+        await asyncio.to_thread(
+            tiktokvoice.tts,
+            text,
+            voice=str(self.config.voice),
+            filename=self.speech_path,
+        )
 
         return self.speech_path
 
@@ -91,9 +101,9 @@ class SynthGenerator:
 
     async def generate_with_airforce(self, text: str) -> str:
         url = f"https://api.airforce/get-audio?text={text}&voice={self.config.voice}"
-        async with httpx.AsyncClient() as client:
-            res = await client.get(url)
-            save(res.content, self.speech_path)
+        client = get_httpx_client()
+        res = await client.get(url, timeout=httpx.Timeout(5.0))
+        save(res.content, self.speech_path)
         return self.speech_path
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(4), after=log_attempt_number) # type: ignore
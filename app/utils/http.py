@@ -0,0 +1,48 @@
+import asyncio
+import weakref
+
+import aiohttp
+import httpx
+import requests
+
+# connection pools shared by every job running in this process, the async
+# ones are bound to the event loop that created them
+_httpx_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_aiohttp_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+requests_session = requests.Session()
+
+
+def get_httpx_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _httpx_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=None)
+        _httpx_clients[loop] = client
+    return client
+
+
+def get_aiohttp_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _aiohttp_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession()
+        _aiohttp_sessions[loop] = session
+    return session
+
+
+async def close_sessions():
+    """closes the pools of the running loop, call before the loop exits"""
+    loop = asyncio.get_running_loop()
+
+    client = _httpx_clients.pop(loop, None)
+    if client:
+        await client.aclose()
+
+    session = _aiohttp_sessions.pop(loop, None)
+    if session:
+        await session.close()
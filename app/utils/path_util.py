@@ -5,8 +5,8 @@ import hashlib
 import os
 import shutil
 
-import aiohttp
 from loguru import logger
+from app.utils.http import get_aiohttp_session
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 
@@ -41,14 +41,14 @@ async def download_resource(
             logger.info(f"Found resource in cache: {file_cache_path}")
             return file_path
 
-    async with aiohttp.ClientSession() as session:
-        logger.info(f"Downloading resource from: {url}")
-        async with session.get(url) as response:
-            with open(file_path, "wb") as f:
-                f.write(await response.read())
-                logger.debug(f"Downloaded resource from: {url}")
+    session = get_aiohttp_session()
+    logger.info(f"Downloading resource from: {url}")
+    async with session.get(url) as response:
+        with open(file_path, "wb") as f:
+            f.write(await response.read())
+            logger.debug(f"Downloaded resource from: {url}")
 
-                # save to cache audios
-                shutil.copy2(file_path, cache_dir)
-                return os.path.join(dir, os.path.basename(url))
+            # save to cache audios
+            shutil.copy2(file_path, cache_dir)
+            return os.path.join(dir, os.path.basename(url))
 
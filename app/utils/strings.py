@@ -1,3 +1,6 @@
+import functools
+import re
+
 import ffmpeg
 from loguru import logger
 import spacy
@@ -11,10 +14,16 @@ import ffmpeg
 from loguru import logger
 from pydub import AudioSegment
 
+@functools.lru_cache(maxsize=1)
+def load_nlp():
+    """loads the spacy pipeline once per process"""
+    return spacy.load("en_core_web_sm")
+
+
 def split_by_dot_or_newline(text: str, min_char_len: int = 80) -> list[str]:
     """Splits text into sentences using spacy and merges short sentences to a minimum character length."""
 
-    nlp = spacy.load("en_core_web_sm")
+    nlp = load_nlp()
     doc = nlp(text)
     sentences = [sent.text.strip() for sent in doc.sents]
 
@@ -39,6 +48,59 @@ def split_by_dot_or_newline(text: str, min_char_len: int = 80) -> list[str]:
     return merged_sentences
 
 
+# end of a sentence: whitespace after terminal punctuation, or a line break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class SentenceSplitter:
+    """Incremental version of split_by_dot_or_newline for streamed text.
+
+    Chunks are fed as they arrive and finished sentences are returned as soon
+    as a boundary is seen, merged up to `min_char_len` the same way
+    split_by_dot_or_newline merges them. Boundaries come from punctuation
+    rather than spacy, so abbreviations like "Mr." can split early.
+    """
+
+    def __init__(self, min_char_len: int = 80):
+        self.min_char_len = min_char_len
+        self.buffer = ""
+        self.current = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        self.buffer += chunk
+        parts = SENTENCE_BOUNDARY.split(self.buffer)
+
+        # the tail has no boundary after it yet
+        self.buffer = parts.pop()
+
+        merged = []
+        for part in parts:
+            merged.extend(self._merge(part))
+        return merged
+
+    def flush(self) -> list[str]:
+        merged = self._merge(self.buffer)
+        self.buffer = ""
+
+        if self.current.strip():
+            merged.append(self.current.strip())
+        self.current = ""
+        return merged
+
+    def _merge(self, sentence: str) -> list[str]:
+        sentence = sentence.strip()
+        if not sentence:
+            return []
+
+        if len(self.current) + len(sentence) < self.min_char_len:
+            self.current += " " + sentence
+            return []
+
+        merged = [self.current.strip()] if self.current.strip() else []
+        self.current = sentence
+        return merged
+
+
 
 def log_attempt_number(retry_state):
     """return the result of the last call attempt"""
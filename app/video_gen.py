@@ -1,10 +1,13 @@
+import asyncio
 import multiprocessing
 import os
 import random
 from typing import TYPE_CHECKING, Literal
 from pathlib import Path
 
+from app.cpu_governor import governor
 from app.effects import zoom_in_effect, zoom_out_effect
+from app.filtergraph import FilterGraphOptimizer
 from app.utils.strings import (
     FFMPEG_TYPE,
     FileClip,
@@ -46,6 +49,7 @@ class VideoGeneratorConfig(BaseModel):
     bg_color: str | None = None
     subtitles_position: str = "center,center"
     threads: int = multiprocessing.cpu_count()
+    """ upper bound for the threads the cpu governor grants a render """
 
     watermark_path_or_text: str | None = "VoidFace"
     watermark_opacity: float = 0.5
@@ -57,6 +61,12 @@ class VideoGeneratorConfig(BaseModel):
 
     color_effect: str = "gray"
 
+    fps: int = 25
+    """ frame rate the clips are normalized to before filtering """
+
+    optimize_filtergraph: bool = True
+    """ run the filtergraph optimizer before handing the graph to ffmpeg """
+
 
 class VideoGenerator:
     def __init__(
@@ -69,6 +79,22 @@ class VideoGenerator:
         self.base_engine = base_class
 
         self.ffmpeg_cmd = os.path.join(os.getcwd(), "bin/ffmpeg")
+        self._video_sizes: dict[str, tuple[int, int] | None] = {}
+
+    def probe_video_size(self, filepath: str) -> tuple[int, int] | None:
+        if filepath not in self._video_sizes:
+            try:
+                self._video_sizes[filepath] = get_video_size(filepath)
+            except Exception as e:
+                logger.warning(f"Failed to probe size of {filepath}: {e}")
+                self._video_sizes[filepath] = None
+        return self._video_sizes[filepath]
+
+    def optimize_graph(self, output: FFMPEG_TYPE) -> FFMPEG_TYPE:
+        optimizer = FilterGraphOptimizer(
+            fps=self.config.fps, size_resolver=self.probe_video_size
+        )
+        return optimizer.optimize(output)
 
     async def get_video_url(self, search_term: str) -> str | None:
         try:
@@ -115,24 +141,27 @@ class VideoGenerator:
         )
         return ffmpeg.concat(video_stream, audio_mix, v=1, a=1)
 
-    def concatenate_clips(self, inputs: list[FileClip], effects: list = []):
-        processed_clips = []
-        for data in inputs:
-            clip = data.ffmpeg_clip
+    def process_clip(self, data: FileClip, effect=None):
+        clip = data.ffmpeg_clip
 
-            if len(effects) > 0:
-                effect = random.choice(effects)
-                clip = effect(clip)
-            clip = clip.filter("scale", 1080, 1920)
+        if effect:
+            clip = effect(clip)
+        clip = clip.filter("scale", 1080, 1920)
 
-            # apply gray effect for motivational video
-            if (
-                self.config.color_effect == "gray"
-                and self.base_engine.config.video_type == "motivational"
-            ):
-                clip = clip.filter("format", "gray")
+        # apply gray effect for motivational video
+        if (
+            self.config.color_effect == "gray"
+            and self.base_engine.config.video_type == "motivational"
+        ):
+            clip = clip.filter("format", "gray")
+
+        return clip
 
-            processed_clips.append(clip)
+    def concatenate_clips(self, inputs: list[FileClip], effects: list = []):
+        processed_clips = []
+        for data in inputs:
+            effect = random.choice(effects) if len(effects) > 0 else None
+            processed_clips.append(self.process_clip(data, effect))
         final_video = ffmpeg.concat(*processed_clips, v=1, a=0)
         return final_video
 
@@ -146,6 +175,65 @@ class VideoGenerator:
         logger.info("Generating video...")
         effects = [zoom_out_effect, zoom_in_effect]
 
+        if self.base_engine.config.video_type == "motivational":
+            effects = []
+
+        video_stream = self.concatenate_clips(clips, effects)
+        return await self.encode_video(
+            video_stream, speech_filter, subtitles_path, video_duration
+        )
+
+    async def render_segment(self, clip: FileClip, output_path: str, effect=None) -> str:
+        """renders the clip of a single sentence, so it can be stitched with
+        segments rendered by earlier runs"""
+        stream = self.process_clip(clip, effect)
+        stream = stream.filter("fps", fps=self.config.fps).filter("format", "yuv420p")
+
+        with governor.acquire(
+            f"{self.job_id}_segment",
+            priority=self.base_engine.config.priority,
+            max_threads=self.config.threads,
+        ) as grant:
+            output = ffmpeg.output(
+                stream,
+                output_path,
+                vcodec="libx264",
+                preset="veryfast",
+                threads=grant.threads,
+            )
+            await asyncio.to_thread(
+                output.run, overwrite_output=True, cmd=self.ffmpeg_cmd, quiet=True
+            )
+
+        return output_path
+
+    async def stitch_segments(
+        self,
+        segment_paths: list[str],
+        speech_filter: FFMPEG_TYPE,
+        subtitles_path: str,
+        video_duration: float,
+    ) -> str:
+        """joins segments rendered by render_segment, then adds the watermark,
+        subtitles and audio in a single encode"""
+        logger.info(f"Stitching {len(segment_paths)} segments...")
+
+        list_path = (Path(self.cwd) / f"{self.job_id}_segments.txt").as_posix()
+        with open(list_path, "w") as f:
+            f.writelines(f"file '{path}'\n" for path in segment_paths)
+
+        video_stream = ffmpeg.input(list_path, f="concat", safe=0).video
+        return await self.encode_video(
+            video_stream, speech_filter, subtitles_path, video_duration
+        )
+
+    async def encode_video(
+        self,
+        video_stream: FFMPEG_TYPE,
+        speech_filter: FFMPEG_TYPE,
+        subtitles_path: str,
+        video_duration: float,
+    ) -> str:
         # Define output path
         output_path = (Path(self.cwd) / f"{self.job_id}_final.mp4").as_posix()
 
@@ -155,10 +243,6 @@ class VideoGenerator:
             t=video_duration,
         )
 
-        if self.base_engine.config.video_type == "motivational":
-            effects = []
-
-        video_stream = self.concatenate_clips(clips, effects)
         video_stream = self.apply_watermark(video_stream)
         video_stream = self.apply_subtitle(video_stream, subtitles_path)
         video_stream = self.add_audio_mix(
@@ -167,18 +251,29 @@ class VideoGenerator:
             background_music_filter=music_input,
         )
 
-        output = ffmpeg.output(
-            video_stream,
-            output_path,
-            vcodec="libx264",
-            acodec="aac",
-            preset="veryfast",
-            threads=2,
-            # loglevel="quiet",
-        )
-
-        logger.debug(f"FFMPEG CMD: {output.get_args()}")
-        output.run(overwrite_output=True, cmd=self.ffmpeg_cmd)
+        with governor.acquire(
+            self.job_id,
+            priority=self.base_engine.config.priority,
+            max_threads=self.config.threads,
+        ) as grant:
+            output = ffmpeg.output(
+                video_stream,
+                output_path,
+                vcodec="libx264",
+                acodec="aac",
+                preset="veryfast",
+                threads=grant.threads,
+                # loglevel="quiet",
+            ).global_args("-filter_complex_threads", str(grant.filter_threads))
+
+            if self.config.optimize_filtergraph:
+                output = self.optimize_graph(output)
+
+            logger.debug(f"FFMPEG CMD: {output.get_args()}")
+            # run in a thread so other jobs on this loop keep going while we encode
+            await asyncio.to_thread(
+                output.run, overwrite_output=True, cmd=self.ffmpeg_cmd
+            )
 
         logger.info("Video generation complete.")
         return output_path
@@ -287,12 +382,24 @@ class VideoGenerator:
         logger.debug("Creating GIF...")
         gif_path = f"{self.cwd}/{self.job_id}.gif"
 
-        (
-            ffmpeg.input(master_video_path, ss=start_time, t=end_time - start_time)
-            .filter("fps", fps=6)
-            .filter("scale", "iw/2", "ih/2")
-            .output(gif_path, format="gif", loop=0, pix_fmt="rgb24")
-            .run(overwrite_output=True)
-        )
+        with governor.acquire(
+            f"{self.job_id}_gif",
+            priority=self.base_engine.config.priority,
+            max_threads=self.config.threads,
+        ) as grant:
+            (
+                ffmpeg.input(master_video_path, ss=start_time, t=end_time - start_time)
+                .filter("fps", fps=6)
+                .filter("scale", "iw/2", "ih/2")
+                .output(
+                    gif_path,
+                    format="gif",
+                    loop=0,
+                    pix_fmt="rgb24",
+                    threads=grant.threads,
+                )
+                .global_args("-filter_complex_threads", str(grant.filter_threads))
+                .run(overwrite_output=True)
+            )
 
         return gif_path
\ No newline at end of file
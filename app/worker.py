@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import atexit
+import multiprocessing
+import os
+
+from loguru import logger
+
+from app.base import BaseEngine, StartResponse
+from app.config import jobs_db_path, settings
+from app.job_queue import Job, JobKind, JobQueue
+from app.reels_maker import ReelsMaker, ReelsMakerConfig
+from app.story_teller import StoryTeller, StoryTellerConfig
+from app.utils.strings import load_nlp
+
+ENGINES = {
+    "reels": (ReelsMaker, ReelsMakerConfig),
+    "story": (StoryTeller, StoryTellerConfig),
+}
+
+
+def create_engine(kind: JobKind, config: dict) -> BaseEngine:
+    engine_cls, config_cls = ENGINES[kind]
+    return engine_cls(config_cls.model_validate(config))  # type: ignore
+
+
+async def run_job(job: Job) -> StartResponse:
+    engine = create_engine(job.kind, job.config)
+    return await engine.start()
+
+
+async def work(queue: JobQueue, worker_id: str, poll_interval: float):
+    parent_pid = os.getppid()
+    logger.info(f"Worker {worker_id} waiting for jobs")
+
+    # stop once the process that started us is gone
+    while os.getppid() == parent_pid:
+        job = queue.claim(worker_id)
+        if not job:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} picked up {job.kind} job {job.id}")
+        try:
+            result = await run_job(job)
+            queue.complete(job.id, result)
+            logger.info(f"Job {job.id} done: {result.video_file_path}")
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed: {e}")
+            queue.fail(job.id, str(e))
+
+
+def worker_main(db_path: str, worker_id: str, poll_interval: float):
+    # the engines are imported with this module, load the rest of the heavy
+    # state up front so every job this worker runs starts warm
+    load_nlp()
+
+    queue = JobQueue(db_path)
+    asyncio.run(work(queue, worker_id, poll_interval))
+
+
+class WorkerPool:
+    """Runs queued jobs in long lived worker processes"""
+
+    def __init__(
+        self,
+        db_path: str = jobs_db_path,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+        poll_interval: float = settings.WORKER_POLL_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.queue = JobQueue(db_path)
+        self.processes: list[multiprocessing.Process] = []
+
+    def start(self):
+        # only one pool runs per queue, anything still running was interrupted
+        self.queue.requeue_running()
+
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(self.concurrency):
+            worker_id = f"worker-{os.getpid()}-{i}"
+            process = ctx.Process(
+                target=worker_main,
+                args=(self.db_path, worker_id, self.poll_interval),
+                name=worker_id,
+            )
+            process.start()
+            self.processes.append(process)
+
+        atexit.register(self.stop)
+        logger.info(f"Started {self.concurrency} workers on {self.db_path}")
+
+    def stop(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout=10)
+        self.processes = []
+
+    def join(self):
+        for process in self.processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run reels rendering workers")
+    parser.add_argument("--workers", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument("--db", default=jobs_db_path)
+    args = parser.parse_args()
+
+    pool = WorkerPool(db_path=args.db, concurrency=args.workers)
+    pool.start()
+    pool.join()
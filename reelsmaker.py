@@ -7,15 +7,22 @@ from uuid import uuid4
 from loguru import logger
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
-from app.reels_maker import ReelsMaker, ReelsMakerConfig
+from app.job_queue import JobQueue
+from app.reels_maker import ReelsMakerConfig
 from app.synth_gen import VOICE_PROVIDER, SynthConfig
 from app.video_gen import VideoGeneratorConfig
+from app.worker import WorkerPool
 
 
-if "queue" not in st.session_state:
-    st.session_state["queue"] = {}
+@st.cache_resource
+def get_worker_pool() -> WorkerPool:
+    # started once per server, shared by every browser session
+    pool = WorkerPool()
+    pool.start()
+    return pool
 
-queue: dict[str, ReelsMakerConfig] = st.session_state["queue"]
+
+job_queue: JobQueue = get_worker_pool().queue
 
 
 async def download_to_path(dest: str, buff: UploadedFile) -> str:
@@ -24,6 +31,39 @@ async def download_to_path(dest: str, buff: UploadedFile) -> str:
     return dest
 
 
+async def show_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        st.warning(f"Job {job_id} not found")
+        return
+
+    status = st.empty()
+    waited = False
+
+    while job and job.status in ("queued", "running"):
+        waited = True
+        if job.status == "queued":
+            ahead = job_queue.position(job.id)
+            status.info(f"Waiting in queue, {ahead} job(s) ahead of yours...")
+        else:
+            status.info("Generating reels, this will take ~5mins or less...")
+
+        await asyncio.sleep(2)
+        job = job_queue.get(job_id)
+
+    status.empty()
+
+    if not job or job.status == "failed":
+        st.error(job.error if job else f"Job {job_id} disappeared")
+        return
+
+    video_file_path = (job.result or {}).get("video_file_path")
+    if waited:
+        st.balloons()
+    st.video(video_file_path, autoplay=True)
+    st.download_button("Download Reels", video_file_path, file_name="reels.mp4")
+
+
 async def main():
     st.title("AI Reels Story Maker")
     st.write("Create Engaging Faceless Videos for Social Media in Seconds")
@@ -158,26 +198,18 @@ async def main():
 
         print(f"starting reels maker: {config.model_dump_json()}")
 
+        job = job_queue.submit("reels", config, priority=config.priority)
+        logger.debug(f"Added to queue: {job.id}")
+        st.query_params["job"] = job.id
+
         st.write(
             "This process is CPU-intensive and will take a considerable time to complete"
         )
-        with st.spinner("Generating reels, this will take ~5mins or less..."):
-            try:
-                if len(queue.items()) > 1:
-                    raise Exception("queue is full - someone else is generating reels")
-
-                logger.debug("Added to queue")
-                queue[queue_id] = config
-
-                reels_maker = ReelsMaker(config)
-                output = await reels_maker.start()
-                st.balloons()
-                st.video(output.video_file_path, autoplay=True)
-                st.download_button("Download Reels", output.video_file_path, file_name="reels.mp4")
-            except Exception as e:
-                del queue[queue_id]
-                logger.exception(f"removed from queue: {queue_id}: -> {e}")
-                st.error(e)
+
+    # the job id lives in the url so the result survives reruns and reloads
+    job_id = st.query_params.get("job")
+    if job_id:
+        await show_job(job_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import ffmpeg
+import pytest
+
+from app.effects import zoom_in_effect, zoom_out_effect
+from app.video_gen import VideoGenerator, VideoGeneratorConfig
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg binary is required"
+)
+
+CLIP_DURATION = 2
+CLIP_COUNT = 4
+
+
+@pytest.fixture(scope="module")
+def clips(tmp_path_factory) -> list[str]:
+    base = tmp_path_factory.mktemp("filtergraph_bench")
+    paths = []
+    for i in range(CLIP_COUNT):
+        path = (base / f"clip_{i}.mp4").as_posix()
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=50:duration={CLIP_DURATION}",
+                "-pix_fmt", "yuv420p", path,
+            ],
+            check=True,
+        )
+        paths.append(path)
+    return paths
+
+
+def make_generator(tmp_path, optimize: bool, video_type: str) -> VideoGenerator:
+    config = VideoGeneratorConfig(watermark_type="none", optimize_filtergraph=optimize)
+    engine = SimpleNamespace(
+        cwd=tmp_path.as_posix(),
+        config=SimpleNamespace(
+            job_id="bench", video_gen_config=config, video_type=video_type
+        ),
+    )
+    return VideoGenerator(engine)  # type: ignore
+
+
+@pytest.mark.parametrize("video_type", ["narrator", "motivational"])
+@pytest.mark.parametrize("optimize", [False, True], ids=["baseline", "optimized"])
+def test_concatenate_clips_render(benchmark, tmp_path, clips, optimize, video_type):
+    generator = make_generator(tmp_path, optimize, video_type)
+    effects = [zoom_in_effect, zoom_out_effect] if video_type == "narrator" else []
+
+    def render():
+        inputs = [
+            SimpleNamespace(ffmpeg_clip=ffmpeg.input(path, t=CLIP_DURATION))
+            for path in clips
+        ]
+        video = generator.concatenate_clips(inputs, effects)  # type: ignore
+        video = generator.apply_watermark(video)
+        output = ffmpeg.output(video, "-", format="null")
+        if optimize:
+            output = generator.optimize_graph(output)
+        output.run(quiet=True, overwrite_output=True)
+
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+    frames = CLIP_COUNT * CLIP_DURATION * generator.config.fps
+    benchmark.extra_info["fps"] = round(frames / benchmark.stats["mean"], 1)
@@ -0,0 +1,24 @@
+from app.cpu_governor import CPUGovernor
+
+
+def test_splits_cores_by_priority(mocker):
+    governor = CPUGovernor(cpus=8)
+    mocker.patch.object(governor, "load_average", return_value=0.0)
+
+    first = governor.grant("first")
+    assert first.threads == 8
+
+    second = governor.grant("second", priority=3)
+    assert second.threads == 6
+    assert second.filter_threads == 3
+
+
+def test_respects_max_threads_and_external_load(mocker):
+    governor = CPUGovernor(cpus=8)
+    mocker.patch.object(governor, "load_average", return_value=6.0)
+
+    with governor.acquire("job", max_threads=4) as grant:
+        assert grant.threads == 2
+        assert len(governor.active) == 1
+
+    assert governor.active == []
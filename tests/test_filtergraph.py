@@ -0,0 +1,80 @@
+import ffmpeg
+
+from app.filtergraph import FilterGraphOptimizer, graph_stats
+
+
+def build_graph(filenames: list[str], gray: bool = False, zoom: bool = True):
+    clips = []
+    for filename in filenames:
+        clip = ffmpeg.input(filename, t=5)
+        if zoom:
+            clip = clip.filter("zoompan", z="1+(0.05*in/24)", d=1)
+        clip = clip.filter("scale", 1080, 1920)
+        if gray:
+            clip = clip.filter("format", "gray")
+        clips.append(clip)
+
+    video = ffmpeg.concat(*clips, v=1, a=0)
+    video = video.filter("drawtext", text="VoidFace")
+    return ffmpeg.output(video, "out.mp4", vcodec="libx264")
+
+
+def test_hoists_uniform_scale_past_concat():
+    sizes = {"a.jpg": (1024, 1024), "b.jpg": (1024, 1024), "c.jpg": (1024, 1024)}
+    output = build_graph(list(sizes), zoom=False)
+    assert graph_stats(output).filter_counts["scale"] == 3
+
+    optimizer = FilterGraphOptimizer(fps=25, size_resolver=sizes.get)
+    stats = graph_stats(optimizer.optimize(output))
+
+    assert stats.filter_counts["scale"] == 1
+    assert stats.filter_counts["fps"] == 3
+    assert stats.inputs == 3
+
+
+def test_folds_scale_into_zoompan():
+    output = build_graph(["a.mp4", "b.mp4", "c.mp4"])
+
+    optimized = FilterGraphOptimizer(fps=25).optimize(output)
+    stats = graph_stats(optimized)
+
+    assert "scale" not in stats.filter_counts
+    assert stats.filter_counts["zoompan"] == 3
+    assert stats.filter_counts["fps"] == 3
+
+
+def test_keeps_scale_when_segment_sizes_differ():
+    sizes = {"a.mp4": (1920, 1080), "b.mp4": (3840, 2160)}
+    output = build_graph(list(sizes), gray=True, zoom=False)
+
+    optimizer = FilterGraphOptimizer(fps=25, size_resolver=sizes.get)
+    stats = graph_stats(optimizer.optimize(output))
+
+    # gray is hoisted, the scales must stay per clip for concat
+    assert stats.filter_counts["scale"] == 2
+    # the hoisted gray pins the pixel format, no extra normalization
+    assert stats.filter_counts["format"] == 1
+
+
+def test_drops_redundant_scale():
+    sizes = {"a.mp4": (1080, 1920), "b.mp4": (1920, 1080)}
+    output = build_graph(list(sizes), zoom=False)
+
+    optimizer = FilterGraphOptimizer(fps=25, size_resolver=sizes.get)
+    stats = graph_stats(optimizer.optimize(output))
+
+    assert stats.filter_counts["scale"] == 1
+
+
+def test_optimized_graph_compiles():
+    output = build_graph(["a.mp4", "b.mp4"], gray=True)
+    output = output.global_args("-filter_complex_threads", "2")
+    args = FilterGraphOptimizer(fps=30).optimize(output).get_args()
+
+    filter_complex = args[args.index("-filter_complex") + 1]
+    assert "concat=a=0:n=2:v=1" in filter_complex
+    assert "fps=fps=30" in filter_complex
+    assert filter_complex.count("s=1080x1920") == 2
+    assert filter_complex.count("format=gray") == 1
+    assert "scale" not in filter_complex
+    assert args[-2:] == ["-filter_complex_threads", "2"]
@@ -0,0 +1,23 @@
+from app.image_index import ImagePromptIndex, prompt_similarity
+
+SCENE = "A small, dimly lit room with worn wooden furniture, a single flickering candle casting shadows on the cracked walls, and an old woman gazing thoughtfully out of a tiny window"
+
+
+def test_reuses_near_identical_prompt_of_the_same_style(tmp_path):
+    index = ImagePromptIndex((tmp_path / "prompts.db").as_posix())
+    index.add("Disney Toon", SCENE, "/cache/room.jpg")
+    index.add("Disney Toon", "A bustling marketplace with colorful stalls", "/cache/market.jpg")
+
+    reworded = SCENE.replace("tiny window", "small window")
+    match = index.best_match("Disney Toon", reworded, threshold=0.85)
+
+    assert match and match.image_path == "/cache/room.jpg"
+    assert 0.85 <= match.score < 1
+    assert index.best_match("Human Realism", reworded, threshold=0.85) is None
+    assert index.best_match("Disney Toon", reworded, threshold=1.01) is None
+
+
+def test_different_scenes_do_not_match():
+    other = SCENE.replace("an old woman gazing thoughtfully out of", "a cat sleeping under")
+    assert prompt_similarity(SCENE, other) < 0.8
+    assert prompt_similarity(SCENE, SCENE.upper() + "!") == 1
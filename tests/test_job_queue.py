@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+
+from app.job_queue import JobQueue
+
+
+class DummyConfig(BaseModel):
+    job_id: str
+    prompt: str = "a motivation quote about life"
+
+
+class DummyResponse(BaseModel):
+    video_file_path: str
+
+
+def test_claims_by_priority_then_age(tmp_path):
+    queue = JobQueue((tmp_path / "jobs.db").as_posix())
+
+    low = queue.submit("reels", DummyConfig(job_id="low"))
+    first = queue.submit("reels", DummyConfig(job_id="first"), priority=5)
+    second = queue.submit("story", DummyConfig(job_id="second"), priority=5)
+
+    assert queue.position(low.id) == 2
+
+    claimed = [queue.claim("w1"), queue.claim("w2"), queue.claim("w1")]
+    assert [job.id for job in claimed] == [first.id, second.id, low.id]  # type: ignore
+    assert claimed[0].status == "running"  # type: ignore
+    assert claimed[0].config["job_id"] == "first"  # type: ignore
+    assert queue.claim("w1") is None
+
+
+def test_complete_fail_and_requeue(tmp_path):
+    queue = JobQueue((tmp_path / "jobs.db").as_posix())
+
+    done = queue.submit("reels", DummyConfig(job_id="done"))
+    failed = queue.submit("reels", DummyConfig(job_id="failed"))
+    interrupted = queue.submit("reels", DummyConfig(job_id="interrupted"))
+    for _ in range(3):
+        queue.claim("w1")
+
+    queue.complete(done.id, DummyResponse(video_file_path="/tmp/done.mp4"))
+    queue.fail(failed.id, "boom")
+
+    assert queue.get(done.id).result == {"video_file_path": "/tmp/done.mp4"}  # type: ignore
+    assert queue.get(failed.id).error == "boom"  # type: ignore
+
+    assert queue.requeue_running() == 1
+    assert queue.get(interrupted.id).status == "queued"  # type: ignore
@@ -0,0 +1,65 @@
+from langchain_core.load import dumps
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.outputs import Generation
+
+from app.llm_cache import LLMCache, prompt_similarity
+
+
+def llm_string(temperature: float, model: str = "gpt-4o-mini") -> str:
+    return (
+        f'{{"kwargs": {{"model_name": "{model}", "temperature": 0.7}}, "lc": 1}}'
+        f"---[('stop', None), ('temperature', {temperature})]"
+    )
+
+
+def prompt(topic: str) -> str:
+    return dumps(
+        [
+            SystemMessage(content="You are a motivational reels narrator."),
+            HumanMessage(content=f"Write a motivational quote about {topic}."),
+        ]
+    )
+
+
+def test_key_ignores_sampling_params(tmp_path):
+    cache = LLMCache((tmp_path / "llm.db").as_posix())
+    cache.update(prompt("focus"), llm_string(0.5), [Generation(text="stay focused")])
+
+    hit = cache.lookup(prompt("focus"), llm_string(1.1))
+    assert hit and hit[0].text == "stay focused"
+
+    assert cache.lookup(prompt("focus"), llm_string(0.5, model="gpt-4o")) is None
+    assert cache.lookup(prompt("love"), llm_string(0.5)) is None
+
+    stats = cache.stats()
+    assert (stats.entries, stats.exact_hits, stats.misses) == (1, 1, 2)
+    assert round(stats.hit_rate, 2) == 0.33
+
+
+def test_similar_prompts_share_a_response(tmp_path):
+    cache = LLMCache((tmp_path / "llm.db").as_posix(), similarity=0.6)
+    cache.update(
+        prompt("focus and discipline"), llm_string(0.5), [Generation(text="cached")]
+    )
+
+    hit = cache.lookup(prompt("Discipline and focus!"), llm_string(0.9))
+    assert hit and hit[0].text == "cached"
+    assert cache.lookup(prompt("love"), llm_string(0.9)) is None
+    assert cache.stats().similar_hits == 1
+
+
+def test_entries_expire(tmp_path, mocker):
+    cache = LLMCache((tmp_path / "llm.db").as_posix(), ttl=60)
+    now = mocker.patch("app.llm_cache.time.time", return_value=1000.0)
+    cache.update(prompt("focus"), llm_string(0.5), [Generation(text="stay focused")])
+
+    now.return_value = 1059.0
+    assert cache.lookup(prompt("focus"), llm_string(0.5))
+    now.return_value = 1061.0
+    assert cache.lookup(prompt("focus"), llm_string(0.5)) is None
+
+
+def test_prompt_similarity_compares_differing_words():
+    template = "write a motivational quote about {} for instagram reels"
+    assert prompt_similarity(template.format("love"), template.format("life")) == 0
+    assert prompt_similarity(template.format("success"), template.format("succes")) > 0.6
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.pipeline import Pipeline
+
+
+@pytest.mark.asyncio
+async def test_runs_independent_stages_concurrently():
+    pipeline = Pipeline("test")
+
+    async def script():
+        await asyncio.sleep(0.05)
+        return "hello world"
+
+    async def search(script):
+        await asyncio.sleep(0.2)
+        return ["hello"]
+
+    async def speech(script):
+        await asyncio.sleep(0.1)
+        return [script.upper()]
+
+    async def render(search, speech):
+        return search + speech
+
+    pipeline.add("script", script)
+    pipeline.add("search", search, deps=["script"])
+    pipeline.add("speech", speech, deps=["script"])
+    pipeline.add("render", render, deps=["search", "speech"])
+
+    results = await pipeline.run()
+
+    assert results["render"] == ["hello", "HELLO WORLD"]
+    assert pipeline.report.critical_path == ["script", "search", "render"]
+    # search and speech overlap, so the run is bound by the longest chain
+    assert pipeline.report.total_seconds < 0.3
+    assert set(pipeline.report.stage_seconds()) == {"script", "search", "speech", "render"}
+
+
+@pytest.mark.asyncio
+async def test_rejects_cycles_and_cancels_on_failure():
+    cyclic = Pipeline("cyclic")
+
+    async def noop(**kwargs):
+        return None
+
+    cyclic.add("a", noop, deps=["b"])
+    cyclic.add("b", noop, deps=["a"])
+    with pytest.raises(ValueError):
+        await cyclic.run()
+
+    failing = Pipeline("failing")
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    failing.add("slow", slow)
+    failing.add("broken", broken)
+    with pytest.raises(RuntimeError):
+        await failing.run()
+    assert cancelled.is_set()
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.prompt_gen import PromptGenerator
+
+
+def fake_model(fail_once: set[str]):
+    """answers with one image prompt per paragraph, and a short list the first
+    time it sees a chunk starting with a sentence in `fail_once`"""
+
+    def respond(prompt_value) -> AIMessage:
+        text = prompt_value.to_string()
+        paragraphs = text.split("[(Paragraphs)]:")[1].split("You must generate")[0]
+        sentences = [line[2:] for line in paragraphs.strip().splitlines()]
+
+        prompts = [f"scene of {sentence}" for sentence in sentences]
+        if sentences[0] in fail_once:
+            fail_once.discard(sentences[0])
+            prompts = prompts[:-1]
+
+        return AIMessage(content=json.dumps({"image_prompts": prompts}))
+
+    return RunnableLambda(respond)
+
+
+@pytest.mark.asyncio
+async def test_chunks_reassemble_in_order_and_retry_failed_chunk(monkeypatch, mocker):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    generator = PromptGenerator()
+
+    sentences = [f"sentence {i}" for i in range(10)]
+    generator.model = fake_model(fail_once={"sentence 4"})  # type: ignore
+    spy = mocker.spy(generator.model, "abatch")
+
+    response = await generator.sentences_to_images(
+        sentences, style="Disney Toon", chunk_size=4, context_size=1
+    )
+
+    assert response.image_prompts == [f"scene of sentence {i}" for i in range(10)]
+    # 3 chunks at first, then only the chunk that came back short
+    assert [len(call.args[0]) for call in spy.call_args_list] == [3, 1]
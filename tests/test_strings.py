@@ -0,0 +1,22 @@
+from app.utils.strings import SentenceSplitter
+
+
+def test_sentence_splitter_emits_merged_sentences_incrementally():
+    splitter = SentenceSplitter(min_char_len=30)
+    text = "Rise early. Work hard and never quit on your dreams! Every day is a new chance.\nBelieve."
+
+    emitted = []
+    for i in range(0, len(text), 7):
+        emitted.append(splitter.feed(text[i : i + 7]))
+    tail = splitter.flush()
+
+    sentences = [s for chunk in emitted for s in chunk] + tail
+    assert sentences == [
+        "Rise early.",
+        "Work hard and never quit on your dreams!",
+        "Every day is a new chance.",
+        "Believe.",
+    ]
+    # the first sentence is out before the rest of the text has arrived
+    first_chunk = next(i for i, chunk in enumerate(emitted) if chunk)
+    assert first_chunk < len(emitted) - 1